@@ -0,0 +1,324 @@
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import scrabble
+
+
+STAGES = [("early", 0), ("mid", 30), ("late", 70)]  # stage of a position by the number of tiles on the board
+
+
+def timed(function, repeat):
+    # returns the time taken by each of repeat calls of function
+    times = []
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - t0)
+    return times
+
+
+def summary(times, operations=1):
+    # min, median and mean seconds per call, and operations per second at the best time
+    times = sorted(times)
+    return {"min": times[0], "median": times[len(times) // 2], "mean": sum(times) / len(times),
+            "per_second": operations / times[0] if times[0] > 0 else None}
+
+
+def read_words(lang="en"):
+    file = open("Dictionaries/" + lang + ".txt", "r")
+    words = [i.replace("\n", "") for i in file.readlines()]
+    file.close()
+    return words
+
+
+def read_positions(file_name="positions.json"):
+    # returns the recorded positions with the stage of the game each one is from
+    file = open(file_name, "r")
+    positions = json.loads("".join(file.readlines()))
+    file.close()
+    for position in positions:
+        tiles = sum([len(row) - row.count(" ") for row in position["board"]])
+        position["stage"] = [name for name, start in STAGES if tiles >= start][-1]
+        position["blanks"] = "*" in position["rack"]
+    return positions
+
+
+def dawg_build_benchmark(words, repeat):
+    # time to build the dict based DAWG and the memory it holds, and time to load the compiled file
+    results = {"words": len(words), "build": summary(timed(lambda: scrabble.DAWG(words), repeat))}
+    tracemalloc.start()
+    dawg = scrabble.DAWG(words)
+    results["memory"] = {"traced_bytes": tracemalloc.get_traced_memory()[0], "nodes": len(dawg.nodes)}
+    tracemalloc.stop()
+    results["compact_bytes"] = scrabble.CompactNodes.from_nodes(dawg.nodes).nbytes()
+    # saved to a temporary file so Dictionaries/en.dawg is left as it is
+    file, file_name = tempfile.mkstemp(suffix=scrabble.DAWG.extension)
+    os.close(file)
+    try:
+        dawg.save(file_name)
+        results["load"] = summary(timed(lambda: scrabble.DAWG.load(file_name), repeat * 10))
+    finally:
+        os.remove(file_name)
+    return results
+
+
+def lookup_benchmark(dawg, words, repeat, count=20000):
+    # contains on words and non words, and find on patterns with one or two wildcards
+    rng = random.Random(0)
+    sample = rng.sample(words, min(count, len(words)))
+    letters = [chr(i) for i in range(ord("A"), ord("Z") + 1)]
+    # swapping one letter makes most words into non words of the same shape
+    misses = []
+    for word in sample:
+        index = rng.randrange(len(word))
+        misses.append(word[:index] + rng.choice(letters) + word[index + 1:])
+    patterns = []
+    for word in sample[:count // 10]:
+        pattern = list(word)
+        for index in rng.sample(range(len(word)), min(len(word), rng.randint(1, 2))):
+            pattern[index] = "*"
+        patterns.append("".join(pattern))
+    results = {}
+    for name, strings in [("contains_words", sample), ("contains_misses", misses)]:
+        results[name] = summary(timed(lambda: [dawg.contains(i) for i in strings], repeat), len(strings))
+    # find keeps its patterns, so find is timed without the cache and again once it holds every pattern
+    results["find"] = summary(timed(lambda: [dawg.search(i) for i in patterns], repeat), len(patterns))
+    dawg.pattern_cache.clear()
+    [dawg.find(i) for i in patterns]
+    results["find_cached"] = summary(timed(lambda: [dawg.find(i) for i in patterns], repeat), len(patterns))
+    results["pattern_cache"] = dawg.pattern_cache.stats()
+    return results
+
+
+def find_move_benchmark(positions, host, repeat, structure=None):
+    # BotV1.find_move latency on each recorded position. the bot is made once, so setting it up isn't timed,
+    # and its kept cross checks are dropped before each call so they're worked out from scratch every time
+    if structure is scrabble.GADDAG:
+        generator = scrabble.GADDAGMoveGenerator(scrabble.dictionaries.get("en", scrabble.GADDAG))
+    else:
+        generator = None
+    bot = scrabble.BotV1(dictionary=host.words, generator=generator)
+    bot.host_main = host
+    results = {"positions": []}
+    for position, index in zip(positions, range(len(positions))):
+        def find_move():
+            bot.checked_board = None
+            bot.board = [list(row) for row in position["board"]]
+            bot.tiles = list(position["rack"])
+            bot.find_move()
+        results["positions"].append(dict([("index", index), ("stage", position["stage"]),
+                                          ("blanks", position["blanks"])] +
+                                         list(summary(timed(find_move, repeat)).items())))
+    for stage, start in STAGES:
+        times = [i["min"] for i in results["positions"] if i["stage"] == stage]
+        results[stage] = sum(times) / len(times) if len(times) > 0 else None
+    results["total"] = sum([i["min"] for i in results["positions"]])
+    return results
+
+
+def parallel_search_benchmark(positions, repeat, process_counts=None):
+    # a ParallelMoveSearch over every position with more and more processes, against one SearchWorker
+    # searching all the anchors in this process
+    process_counts = [1, 2, 4, 8] if process_counts is None else process_counts
+    process_counts = [i for i in process_counts if i <= os.cpu_count()]
+    searches = []
+    for position in positions:
+        bot = scrabble.BotV1()
+        bot.board = [list(row) for row in position["board"]]
+        bot.tiles = list(position["rack"])
+        searches.append((bot.find_lines(), bot.tiles, bot.board))
+    worker = scrabble.SearchWorker()
+    serial = summary(timed(lambda: [worker.search(lines, rack, board, None, 1) for lines, rack, board in searches],
+                           repeat))
+    results = {"positions": len(positions), "cpus": os.cpu_count(), "serial": serial}
+    for processes in process_counts:
+        search = scrabble.ParallelMoveSearch(processes=processes)
+        # the first search of each process loads its dictionary
+        search.find_moves(*searches[0])
+        times = summary(timed(lambda: [search.find_moves(*i) for i in searches], repeat))
+        search.close()
+        times["speedup"] = serial["min"] / times["min"]
+        results[str(processes)] = times
+    return results
+
+
+def scoring_benchmark(positions, host, repeat):
+    # Host.calculate_score and Host.score_placement on the move the bot picks in each position
+    moves = []
+    for position in positions:
+        bot = scrabble.BotV1(dictionary=host.words)
+        bot.host_main = host
+        bot.board = [list(row) for row in position["board"]]
+        bot.tiles = list(position["rack"])
+        move, board, rack = bot.find_move()
+        if move:
+            squares = [(x, y) for y in range(15) for x in range(15) if board[y][x] != bot.board[y][x]]
+            moves.append([bot.board, board, rack, squares, [board[y][x] for x, y in squares]])
+
+    def calculate_scores():
+        for old_board, board, rack, squares, letters in moves:
+            host.board = scrabble.Board(old_board)
+            host.calculate_score(board, rack)
+
+    def score_placements():
+        for old_board, board, rack, squares, letters in moves:
+            host.score_placement(squares, letters, old_board)
+    host_board = host.board
+    results = {"moves": len(moves), "calculate_score": summary(timed(calculate_scores, repeat * 10), len(moves)),
+               "score_placement": summary(timed(score_placements, repeat * 10), len(moves))}
+    host.board = host_board
+    return results
+
+
+def anagram_benchmark(positions, dawg, repeat):
+    # the words a rack can make on its own from the anagram index and from the DAWG's left parts,
+    # and the bingos with the letters on the board
+    index = scrabble.dictionaries.get("en", scrabble.AnagramIndex)
+    racks = [list(position["rack"]) for position in positions]
+    boards = [set([i.upper() for row in position["board"] for i in row if i != " "]) for position in positions]
+
+    def dawg_words():
+        for rack in racks:
+            [i for i in set(dawg.find_left_side(rack, len(rack))) if len(i) > 1 and dawg.contains(i.upper())]
+    results = {"racks": len(racks), "blanks": len([i for i in racks if "*" in i]),
+               "index_words": summary(timed(lambda: [index.find(i) for i in racks], repeat), len(racks)),
+               "dawg_words": summary(timed(dawg_words, repeat), len(racks)),
+               "bingos": summary(timed(lambda: [index.bingos(i, j) for i, j in zip(racks, boards)], repeat),
+                                 len(racks))}
+    return results
+
+
+def bot_game(seed=0, prepare=None, count=2, bots=None):
+    # plays a game between count BotV1s, or bots if given, that score through the host and returns the host
+    # and the bots, prepare is called with the host and the bots before the game is set up
+    bots = [scrabble.BotV1() for i in range(count)] if bots is None else bots
+    host = scrabble.Host(bots[0], seed=seed)
+    for bot in bots[1:]:
+        host.add_player(bot)
+    for bot in bots:
+        bot.host_main = host
+    if prepare is not None:
+        prepare(host, bots)
+    host.set_up_game()
+    host.game_loop()
+    return host, bots
+
+
+class MessageRecorder:
+    """sits between a PlayerHost and its player and keeps every message the player is sent"""
+
+    def __init__(self, player, messages):
+        self.player = player
+        self.messages = messages
+
+    def receive(self, command):
+        self.messages.append(command)
+        self.player.receive(command)
+
+
+def record_messages(seed=0):
+    # returns the messages sent both ways in a game between two bots that get whole boards
+    messages = []
+
+    def record(host, bots):
+        for bot, player in zip(bots, host.players):
+            bot.delta = False
+            bot.log = None
+            player.player = MessageRecorder(bot, messages)
+    host, bots = bot_game(seed, record)
+    return messages + [command for order, command in host.commands]
+
+
+def codec_benchmark(repeat, seed=0):
+    # encodes and decodes a game's messages as text, as the client parses them, and as binary frames
+    codec = scrabble.message_codec
+    messages = record_messages(seed)
+    fields = [codec.parse(i) for i in messages]
+    lines = [(i + "\n").encode() for i in messages]
+    frames = [codec.encode(i) for i in fields]
+    results = {"messages": len(messages), "text_bytes": sum([len(i) for i in lines]),
+               "binary_bytes": sum([len(i) for i in frames]),
+               "text_encode": summary(timed(lambda: [(codec.format(i) + "\n").encode() for i in fields], repeat * 10),
+                                      len(messages)),
+               "text_decode": summary(timed(lambda: [codec.parse(i.decode()[:-1]) for i in lines], repeat * 10),
+                                      len(messages)),
+               "binary_encode": summary(timed(lambda: [codec.encode(i) for i in fields], repeat * 10), len(messages)),
+               "binary_decode": summary(timed(lambda: [codec.decode(i) for i in frames], repeat * 10), len(messages))}
+    return results
+
+
+def run_benchmarks(repeat=3, only=None):
+    # returns the results of every benchmark, or just the ones named in only
+    benchmarks = {}
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    words = read_words()
+    positions = read_positions()
+    host = scrabble.Host(scrabble.PlayerClient("benchmark"))
+    dawg = scrabble.dictionaries.get("en")
+    for name, benchmark in [("dawg_build", lambda: dawg_build_benchmark(words, repeat)),
+                            ("lookup", lambda: lookup_benchmark(dawg, words, repeat)),
+                            ("find_move", lambda: find_move_benchmark(positions, host, repeat)),
+                            ("find_move_gaddag", lambda: find_move_benchmark(positions, host, repeat, scrabble.GADDAG)),
+                            ("parallel_search", lambda: parallel_search_benchmark(positions, repeat)),
+                            ("scoring", lambda: scoring_benchmark(positions, host, repeat)),
+                            ("codec", lambda: codec_benchmark(repeat)),
+                            ("anagrams", lambda: anagram_benchmark(positions, dawg, repeat))]:
+        if only is None or name in only:
+            print("running {0}".format(name), file=sys.stderr)
+            benchmarks[name] = benchmark()
+    return {"commit": commit, "python": platform.python_version(), "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "repeat": repeat, "benchmarks": benchmarks}
+
+
+def compare(old, new, tolerance=0.1, path=""):
+    # returns the times in new that are more than tolerance slower than in old, as [path, old, new]
+    slower = []
+    if isinstance(new, dict):
+        for key, value in new.items():
+            if isinstance(old, dict) and key in old.keys():
+                slower += compare(old[key], value, tolerance, path + "/" + str(key))
+    elif isinstance(new, list):
+        for old_value, value, index in zip(old if isinstance(old, list) else [], new, range(len(new))):
+            slower += compare(old_value, value, tolerance, path + "/" + str(index))
+    elif path.split("/")[-1] in ["min", "early", "mid", "late", "total"] and \
+            isinstance(new, float) and isinstance(old, float) and new > old * (1 + tolerance):
+        slower.append([path, old, new])
+    return slower
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="times the dictionary, move generation and scoring")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", nargs="*", default=None,
+                        help="dawg_build, lookup, find_move, find_move_gaddag, parallel_search, scoring, codec "
+                             "and/or anagrams")
+    parser.add_argument("--output", default=None, help="json file to write, stdout if not given")
+    parser.add_argument("--compare", default=None, help="json file from an earlier run to check against")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    arguments = parser.parse_args()
+    results = run_benchmarks(arguments.repeat, arguments.only)
+    if arguments.output is None:
+        print(json.dumps(results, indent=1))
+    else:
+        file = open(arguments.output, "w")
+        file.write(json.dumps(results, indent=1))
+        file.close()
+    if arguments.compare is not None:
+        file = open(arguments.compare, "r")
+        old = json.loads("".join(file.readlines()))
+        file.close()
+        slower = compare(old["benchmarks"], results["benchmarks"], arguments.tolerance)
+        for path, old_time, new_time in slower:
+            print("slower {0}: {1:.6f}s -> {2:.6f}s".format(path, old_time, new_time), file=sys.stderr)
+        if len(slower) > 0:
+            sys.exit(1)
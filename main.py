@@ -1,4 +1,5 @@
 import tkinter as tk
+import tkinter.simpledialog
 import tkinter.ttk as ttk
 import json
 import scrabble
@@ -336,7 +337,8 @@ class GameCanvas(ttk.Frame):
         for opcode, operand in types:
             if opcode == "tiles" and self.player.tiles is not None:
                 self.set_tiles(self.player.tiles)
-            elif opcode == "board" and self.player.board is not None:
+            elif opcode in ["board", "squares"] and self.player.board is not None:
+                # bots ask for deltas, the client has already put the squares on its board
                 self.set_board()
             elif opcode == "player_count":
                 self.create_player_list()
@@ -349,6 +351,8 @@ class GameCanvas(ttk.Frame):
                 self.set_error_line(error="Invalid Tile Placement")
             elif opcode == "error2":
                 self.set_error_line(error="Invalid Word \"{0}\"".format(operand.capitalize()))
+            elif opcode == "error3":
+                self.set_error_line(error="Choose a Letter for the Blank")
             elif opcode == "winner":
                 if operand.isnumeric() and int(operand) == self.player.order:
                     self.set_error_line(error="You Won")
@@ -390,7 +394,7 @@ class GameCanvas(ttk.Frame):
                         self.player.send("swap: {0}".format("".join(tiles)))
                 elif "exit_game" in self.canvas.gettags(i):
                     # exits to main menu and deletes self from pages
-                    self.player.host_main.playing = False
+                    self.player.host_main.stop()
                     self.controller.set_frame(MainMenu)
                     self.controller.frames.pop(GameCanvas)
                     self.controller.set_full_screen(None)
@@ -405,6 +409,8 @@ class GameCanvas(ttk.Frame):
             # if the held tile is over tile tile bag, it is dropped without moving it
             tile_bag_pos = self.canvas.bbox(self.canvas.find_withtag("tile_bag")[0])
             if tile_bag_pos[0] < x < tile_bag_pos[2] and tile_bag_pos[1] < y < tile_bag_pos[3]:
+                # a blank taken off the board goes back in the bag as "*"
+                self.set_blank_letter((0, "R"))
                 self.canvas.addtag_withtag("swap", "move")
                 self.canvas.dtag("move", "move")
             else:
@@ -430,8 +436,22 @@ class GameCanvas(ttk.Frame):
                     x = bbox[0] + anchor[0] * (bbox[2] - bbox[0]) / 15
                     y = bbox[1] + anchor[1] * (bbox[3] - bbox[1]) / 15
                 self.canvas.moveto("move", x, y)
+                self.set_blank_letter(anchor)
                 self.canvas.dtag("move", "move")
 
+    def set_blank_letter(self, anchor):
+        # a blank put on the board shows the letter it stands for in lower case, and is "*" again on the rack
+        for item in self.canvas.find_withtag("move"):
+            if "tile_text" not in self.canvas.gettags(item):
+                continue
+            letter = self.canvas.itemcget(item, "text")
+            if anchor[1] == "R" and letter.islower():
+                self.canvas.itemconfigure(item, text="*")
+            elif anchor[1] != "R" and letter == "*":
+                letter = tkinter.simpledialog.askstring("Blank", "Letter for the blank:", parent=self)
+                if letter is not None and len(letter) == 1 and letter.isalpha() and letter.isascii():
+                    self.canvas.itemconfigure(item, text=letter.lower())
+
     def on_mouse_motion(self, event):
         x, y = event.x - 10, event.y - 10
         if x < 0:
@@ -1,27 +1,402 @@
+import array
+import atexit
+import bisect
+import collections
+import cProfile
 import datetime
+import hashlib
+import heapq
 import json
+import mmap
+import multiprocessing
 import random
 import os
+import pstats
+import queue
+import struct
+import sys
+import tempfile
 import threading
 import time
 
 
+DICTIONARY_VERSION = 1
+DICTIONARY_HEADER = "<4sI20sII"  # magic, version, sha1 of the source word list, node count, edge count
+
+
+def dictionary_fingerprint(file_name):
+    # sha1 of a word list, used to tell if a compiled dictionary is out of date
+    file = open(file_name, "rb")
+    fingerprint = hashlib.sha1(file.read()).digest()
+    file.close()
+    return fingerprint
+
+
+def temporary_file(file_name):
+    # opens a new file next to file_name to write it in before it's renamed over file_name, every call gets
+    # its own so processes compiling the same dictionary at once never write to each other's file
+    descriptor, temporary_name = tempfile.mkstemp(suffix=".tmp", prefix=os.path.basename(file_name) + ".",
+                                                  dir=os.path.dirname(file_name) or ".")
+    return os.fdopen(descriptor, "wb"), temporary_name
+
+
+def replace_file(file, temporary_name, file_name):
+    # closes a file from temporary_file and moves it to file_name, or removes it if it can't be
+    file.close()
+    try:
+        # mkstemp only lets the owner read it
+        os.chmod(temporary_name, 0o644)
+        os.replace(temporary_name, file_name)
+    except OSError:
+        os.remove(temporary_name)
+        raise
+
+
+def compile_dictionary(lang, structure=None):
+    # builds the DAWG (or GADDAG) for Dictionaries/<lang>.txt and saves it to Dictionaries/<lang>.dawg (or .gaddag)
+    structure = DAWG if structure is None else structure
+    file = open("Dictionaries/" + lang + ".txt", "r")
+    words = file.readlines()
+    file.close()
+    for i in range(len(words)):
+        words[i] = words[i].replace("\n", "")
+    dawg = structure(words)
+    dawg.save("Dictionaries/" + lang + structure.extension,
+              fingerprint=dictionary_fingerprint("Dictionaries/" + lang + ".txt"))
+    return "Dictionaries/" + lang + structure.extension
+
+
+def load_dictionary(lang, structure=None):
+    # loads the compiled dictionary for lang, compiling it first if it is missing or older than the word list
+    structure = DAWG if structure is None else structure
+    text_file, binary_file = "Dictionaries/" + lang + ".txt", "Dictionaries/" + lang + structure.extension
+    if not os.path.exists(text_file):
+        if os.path.exists(binary_file):
+            return structure.load(binary_file)
+        return structure([])
+    if os.path.exists(binary_file):
+        # only the header is read to check the compiled file is for this version and word list
+        file = open(binary_file, "rb")
+        header = file.read(struct.calcsize(DICTIONARY_HEADER))
+        file.close()
+        if len(header) == struct.calcsize(DICTIONARY_HEADER):
+            magic, version, fingerprint = struct.unpack(DICTIONARY_HEADER, header)[:3]
+            if magic == structure.magic and version == DICTIONARY_VERSION and \
+                    fingerprint == dictionary_fingerprint(text_file):
+                return structure.load(binary_file)
+    try:
+        return structure.load(compile_dictionary(lang, structure))
+    except OSError:
+        # if the dictionary folder can't be written to then the DAWG is kept in memory instead
+        file = open(text_file, "r")
+        words = file.readlines()
+        file.close()
+        for i in range(len(words)):
+            words[i] = words[i].replace("\n", "")
+        return structure(words, compact=True)
+
+
+class DictionaryRegistry:
+    """keeps one loaded dictionary per language, structure and word list for the whole process,
+    hosts and bots get the same read only DAWG instead of each loading their own"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._dictionaries = {}  # (lang, structure name, fingerprint) -> DAWG or GADDAG
+
+    def get(self, lang, structure=None):
+        structure = DAWG if structure is None else structure
+        text_file = "Dictionaries/" + lang + ".txt"
+        fingerprint = dictionary_fingerprint(text_file) if os.path.exists(text_file) else None
+        key = (lang, structure.__name__, fingerprint)
+        # the lock is held while loading so two threads asking for the same language only load it once
+        with self._lock:
+            if key not in self._dictionaries:
+                # forgets copies loaded from an older version of the word list
+                for old_key in [i for i in self._dictionaries.keys() if i[:2] == key[:2]]:
+                    self._dictionaries.pop(old_key)
+                self._dictionaries[key] = load_dictionary(lang, structure)
+            return self._dictionaries[key]
+
+    def unload(self, lang=None):
+        # removes a language (or every language) from the registry, the memory is freed
+        # once the hosts and bots still using it are gone
+        with self._lock:
+            for key in [i for i in self._dictionaries.keys() if lang is None or i[0] == lang]:
+                self._dictionaries.pop(key)
+
+    def loaded(self):
+        with self._lock:
+            return list(self._dictionaries.keys())
+
+
+dictionaries = DictionaryRegistry()
+
+
+class CompactNodes:
+    """stores the nodes of a DAWG in flat arrays instead of one dict per node
+    every node has a bitmask of the letters it has edges for, a bitmask of which of those edges end a word
+    and the index of its first edge, the children of each node are stored in order of their letters.
+    indexing gives a read only view that acts like the dict it replaces"""
+    # modify this for use with other languages, "[" comes after "Z" and is the separator in a GADDAG
+    letters = [chr(i) for i in range(ord("A"), ord("Z") + 2)]
+
+    def __init__(self, masks, terminals, offsets, edges):
+        # any sequences of ints work, e.g. arrays or memoryviews of a buffer
+        self.masks = masks
+        self.terminals = terminals
+        self.offsets = offsets
+        self.edges = edges
+
+    @classmethod
+    def from_nodes(cls, nodes):
+        # converts a list of dicts of char -> (child, is_terminal)
+        masks, terminals, offsets, edges = array.array("I"), array.array("I"), array.array("I"), array.array("I")
+        for node in nodes:
+            mask, terminal = 0, 0
+            offsets.append(len(edges))
+            for char in sorted(node.keys()):
+                if char not in cls.letters:
+                    raise ValueError("unsupported letter {0!r}".format(char))
+                bit = 1 << (ord(char) - ord("A"))
+                mask |= bit
+                if node[char][1]:
+                    terminal |= bit
+                edges.append(node[char][0])
+            masks.append(mask)
+            terminals.append(terminal)
+        return cls(masks, terminals, offsets, edges)
+
+    def __len__(self):
+        return len(self.masks)
+
+    def __getitem__(self, index):
+        return CompactNode(self, index)
+
+    def nbytes(self):
+        return sum(len(i) * 4 for i in (self.masks, self.terminals, self.offsets, self.edges))
+
+
+_mask_letters = {}
+
+
+class CompactNode:
+    """read only view of one node in CompactNodes"""
+    __slots__ = ("mask", "terminals", "offset", "edges")
+
+    def __init__(self, nodes, index):
+        self.mask = nodes.masks[index]
+        self.terminals = nodes.terminals[index]
+        self.offset = nodes.offsets[index]
+        self.edges = nodes.edges
+
+    def __contains__(self, char):
+        # the length is checked first as ord only takes one character, other keys are never in a node
+        if len(char) != 1:
+            return False
+        bit = ord(char) - ord("A")
+        return 0 <= bit < 27 and self.mask >> bit & 1 == 1
+
+    def __getitem__(self, char):
+        if len(char) != 1:
+            raise KeyError(char)
+        bit = ord(char) - ord("A")
+        if not (0 <= bit < 27 and self.mask >> bit & 1):
+            raise KeyError(char)
+        # the edge index is the number of letters before this one in the node
+        child = self.edges[self.offset + bin(self.mask & ((1 << bit) - 1)).count("1")]
+        return child, self.terminals >> bit & 1 == 1
+
+    def __len__(self):
+        return bin(self.mask).count("1")
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def keys(self):
+        # the letters for each mask are worked out once and shared between nodes
+        if self.mask not in _mask_letters:
+            _mask_letters[self.mask] = tuple(chr(ord("A") + bit) for bit in range(27) if self.mask >> bit & 1)
+        return _mask_letters[self.mask]
+
+    def items(self):
+        return [(char, self[char]) for char in self.keys()]
+
+
+BLANK_SLOT = 26  # a rack as counts has a slot for each letter from A to Z and then this one for blanks
+ALL_LETTERS = set([chr(i) for i in range(ord("A"), ord("Z") + 1)])
+
+
+def rack_counts(rack):
+    # returns the rack as a list of 27 counts, one for each letter and one for blanks
+    counts = [0] * (BLANK_SLOT + 1)
+    for tile in rack:
+        counts[BLANK_SLOT if tile == "*" else ord(tile) - 65] += 1
+    return counts
+
+
+def rack_order(rack, counts):
+    # returns the letters left in rack once it's down to counts, in the order a set of them iterates.
+    # taking a tile takes its first copy, so the tiles left are the last copies of each letter
+    seen = [0] * (BLANK_SLOT + 1)
+    tiles = []
+    for tile in reversed(rack):
+        slot = BLANK_SLOT if tile == "*" else ord(tile) - 65
+        if seen[slot] < counts[slot]:
+            seen[slot] += 1
+            tiles.append(tile)
+    tiles.reverse()
+    # this keeps the moves in the order searching with lists of tiles found them in
+    return [i for i in set(tiles) if i != "*"]
+
+
+class PatternCache:
+    """a least recently used cache of DAWG.find patterns and their matches, bounded to size patterns.
+    it's shared by every thread using the dictionary so get and put hold a lock. the matches are
+    worked out outside the lock, two threads missing on one pattern at once both work it out"""
+
+    def __init__(self, size=8192):
+        self.size = size
+        self.entries = collections.OrderedDict()  # pattern -> tuple of matches, the oldest used first
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def get(self, pattern):
+        # returns the matches of pattern, or None if they aren't kept
+        with self._lock:
+            matches = self.entries.get(pattern)
+            if matches is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.entries.move_to_end(pattern)
+            return matches
+
+    def put(self, pattern, matches):
+        with self._lock:
+            self.entries[pattern] = matches
+            self.entries.move_to_end(pattern)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"size": self.size, "entries": len(self.entries), "hits": self.hits, "misses": self.misses,
+                    "evictions": self.evictions}
+
+
 class DAWG:
     """the basic idea of a DAWG, made to be more "python-friendly"
-    the saved structure is still stored as an automata"""
+    the saved structure is still stored as an automata.
+    compact=True keeps the nodes in CompactNodes, which uses far less memory than the dicts"""
+    magic = b"DAWG"  # identifies the structure in files written by save
+    extension = ".dawg"
+    visits = 0  # calls of find_left_side and find_right_side, for TurnStats
+    cache_size = 8192  # patterns kept by find, 0 turns the cache off
 
-    def __init__(self, strings):
+    def __init__(self, strings, compact=False):
+        # builds a minimal automaton incrementally from sorted strings (Daciuk et al. 2000)
+        # equal suffixes are merged as soon as a branch can no longer change
         strings.sort()
-        self.nodes = [{}]
+        self.nodes = [{}]  # node 0 is the root, it is filled in once every string has been added
+        root = {}
+        register = {}  # maps the edges of a finished node to its index in self.nodes
+        unchecked = []  # (parent, char, child) for each node on the last added string that isn't finished
+        previous = ""
         for string in strings:
-            current_node = 0
-            for char, index in zip(string, range(len(string))):
-                if char in self.nodes[current_node].keys():
-                    current_node = self.nodes[current_node][char][0]
-                else:
-                    self.nodes[current_node][char] = (len(self.nodes), index == len(string) - 1)
-                    current_node = len(self.nodes)
-                    self.nodes.append({})
+            if string == "" or string == previous:
+                continue
+            # finds how much of the string is already in the automaton
+            common = 0
+            while common < min(len(string), len(previous)) and string[common] == previous[common]:
+                common += 1
+            self._minimise(unchecked, register, common)
+            current_node = unchecked[-1][2] if len(unchecked) > 0 else root
+            for char, index in zip(string[common:], range(common, len(string))):
+                new_node = {}
+                current_node[char] = (new_node, index == len(string) - 1)
+                unchecked.append((current_node, char, new_node))
+                current_node = new_node
+            previous = string
+        self._minimise(unchecked, register, 0)
+        self.nodes[0] = root
+        if compact:
+            self.nodes = CompactNodes.from_nodes(self.nodes)
+        self.pattern_cache = PatternCache(self.cache_size)
+
+    def _minimise(self, unchecked, register, down_to):
+        # replaces finished nodes with an equal node from the register or adds them to it
+        while len(unchecked) > down_to:
+            parent, char, child = unchecked.pop()
+            key = tuple(sorted(child.items()))
+            if key in register:
+                index = register[key]
+            else:
+                index = len(self.nodes)
+                self.nodes.append(child)
+                register[key] = index
+            parent[char] = (index, parent[char][1])
+
+    def save(self, file_name, fingerprint=bytes(20)):
+        # writes the automaton as a header followed by the four CompactNodes arrays (little endian uint32)
+        nodes = self.nodes if isinstance(self.nodes, CompactNodes) else CompactNodes.from_nodes(self.nodes)
+        header = struct.pack(DICTIONARY_HEADER, self.magic, DICTIONARY_VERSION, fingerprint,
+                             len(nodes.masks), len(nodes.edges))
+        # writes to a temporary file first so other processes never map a half written file
+        file, temporary_name = temporary_file(file_name)
+        try:
+            file.write(header)
+            for values in (nodes.masks, nodes.terminals, nodes.offsets, nodes.edges):
+                values = array.array("I", values)
+                if sys.byteorder != "little":
+                    values.byteswap()
+                values.tofile(file)
+        except BaseException:
+            file.close()
+            os.remove(temporary_name)
+            raise
+        replace_file(file, temporary_name, file_name)
+
+    @classmethod
+    def load(cls, file_name):
+        # maps a file written by save into memory, the nodes are read straight out of the mapped pages
+        # so every process that loads the same file shares them
+        file = open(file_name, "rb")
+        try:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        finally:
+            file.close()
+        magic, version, fingerprint, node_count, edge_count = struct.unpack_from(DICTIONARY_HEADER, buffer)
+        if magic != cls.magic or version != DICTIONARY_VERSION:
+            buffer.close()
+            raise ValueError("{0} is not a version {1} {2} file".format(file_name, DICTIONARY_VERSION, cls.__name__))
+        sizes = [node_count, node_count, node_count, edge_count]
+        if len(buffer) != struct.calcsize(DICTIONARY_HEADER) + sum(sizes) * 4:
+            buffer.close()
+            raise ValueError("{0} is truncated".format(file_name))
+        arrays = []
+        start = struct.calcsize(DICTIONARY_HEADER)
+        for size in sizes:
+            if sys.byteorder == "little":
+                arrays.append(memoryview(buffer)[start:start + size * 4].cast("I"))
+            else:
+                values = array.array("I", buffer[start:start + size * 4])
+                values.byteswap()
+                arrays.append(values)
+            start += size * 4
+        dawg = cls.__new__(cls)
+        dawg.nodes = CompactNodes(*arrays)
+        dawg.fingerprint = fingerprint
+        dawg.buffer = buffer
+        dawg.pattern_cache = PatternCache(cls.cache_size)
+        return dawg
 
     def contains(self, string):
         current_node = 0
@@ -35,7 +410,19 @@ class DAWG:
                 return False
 
     def find(self, string, node=0):
+        # returns the words matching string, where "*" is any letter and is lower case in the words.
+        # searches from the root are kept in pattern_cache
         string = string.upper()
+        if node == 0 and self.pattern_cache.size > 0:
+            matches = self.pattern_cache.get(string)
+            if matches is None:
+                matches = tuple(self.search(string))
+                self.pattern_cache.put(string, matches)
+            return list(matches)
+        return self.search(string, node)
+
+    def search(self, string, node=0):
+        # find without the cache, string is upper case
         if len(string) == 1:
             if string == "*":
                 return [i.lower() for i in filter(lambda x: self.nodes[node][x][1], self.nodes[node].keys())]
@@ -52,118 +439,857 @@ class DAWG:
             for letter in letters:
                 if letter in self.nodes[node].keys():
                     if string[0] == "*":
-                        rtn += [letter.lower() + i for i in self.find(string[1:], node=self.nodes[node][letter][0])]
+                        rtn += [letter.lower() + i for i in self.search(string[1:], node=self.nodes[node][letter][0])]
                     else:
-                        rtn += [letter + i for i in self.find(string[1:], node=self.nodes[node][letter][0])]
+                        rtn += [letter + i for i in self.search(string[1:], node=self.nodes[node][letter][0])]
 
             return rtn
 
     def find_left_side(self, rack, max_len, node=0):
-        if max_len == 0 or len(rack) == 0:
-            return []
-        else:
-            rtn = []
-            if "*" in rack:
-                for letter in self.nodes[node].keys():
-                    new_rack = list(rack)
-                    new_rack.pop(new_rack.index("*"))
-                    l = self.find_left_side(new_rack, max_len - 1, node=self.nodes[node][letter][0])
-                    for i in range(len(l)):
-                        l[i] = letter.lower() + l[i]
-                    rtn += l + [letter.lower()]
-            for letter in set(rack):
-                if letter in self.nodes[node].keys():
-                    new_rack = list(rack)
-                    new_rack.pop(new_rack.index(letter))
-                    l = self.find_left_side(new_rack, max_len - 1, node=self.nodes[node][letter][0])
-                    for i in range(len(l)):
-                        l[i] = letter + l[i]
-                    rtn += l + [letter]
-            return rtn
+        # returns every string of up to max_len tiles from rack that starts a word, blanks are lower case.
+        # the rack is kept as letter counts that are taken from and put back as the search goes down and up,
+        # and the letters so far are in one list, so a string is only made when it's added
+        words = []
+        self._left_side(rack_counts(rack), list(rack), {}, max_len, len(rack), node, [], words)
+        return words
+
+    def _left_side(self, counts, rack, orders, max_len, left, node, word, words):
+        # orders is {counts: the order to try the letters left in}, kept for the whole search
+        self.visits += 1
+        if max_len == 0 or left == 0:
+            return
+        edges = self.nodes[node]
+        key = tuple(counts)
+        letters = orders.get(key)
+        if letters is None:
+            letters = orders[key] = rack_order(rack, counts)
+        if counts[BLANK_SLOT] > 0:
+            counts[BLANK_SLOT] -= 1
+            for letter in edges.keys():
+                word.append(letter.lower())
+                self._left_side(counts, rack, orders, max_len - 1, left - 1, edges[letter][0], word, words)
+                words.append("".join(word))
+                word.pop()
+            counts[BLANK_SLOT] += 1
+        for letter in letters:
+            slot = ord(letter) - 65
+            if counts[slot] > 0 and letter in edges:
+                counts[slot] -= 1
+                word.append(letter)
+                self._left_side(counts, rack, orders, max_len - 1, left - 1, edges[letter][0], word, words)
+                words.append("".join(word))
+                word.pop()
+                counts[slot] += 1
 
     def find_right_side(self, word, rack, node=0, right_side=False):
         # input of word is a list where the left size is individual characters and the right side is either a set or "*"
-        if len(word) > 0 and isinstance(word[0], set):
+        # returns the words that fit it using tiles from rack, searched the same way as find_left_side
+        words = []
+        self._right_side(word, 0, rack_counts(rack), node, right_side, [], words)
+        return words
+
+    def _right_side(self, line, i, counts, node, right_side, word, words):
+        # line[i] is the square being filled, word holds the letters put on line[:i]
+        self.visits += 1
+        if i < len(line) and isinstance(line[i], set):
             right_side = True
         if right_side:
-            rtn = []
-            letters = word[0]
+            letters = line[i]
             if letters in ["*", " "]:
-                letters = set([chr(i) for i in range(ord("A"), ord("Z") + 1)])
+                letters = ALL_LETTERS
+            edges = self.nodes[node]
+            # a word can end here if the next square is empty or the end of the line
+            can_end = i + 1 == len(line) or line[i + 1] in ["*", " "] or isinstance(line[i + 1], set)
+            blanks = counts[BLANK_SLOT]
             for letter in letters:
-                if letter in rack and letter in self.nodes[node].keys():
-                    new_rack = list(rack)
-                    new_rack.pop(rack.index(letter))
-                    new_node = self.nodes[node][letter][0]
-                    if self.nodes[node][letter][1] and \
-                            (len(word) == 1 or word[1] in ["*", " "] or isinstance(word[1], set)):
-                        rtn += letter
-                    if len(word) > 1:
-                        tmp = self.find_right_side(word[1:], new_rack, new_node, right_side=True)
-                        rtn += [letter + i for i in tmp]
-                if "*" in rack and letter in self.nodes[node].keys():
-                    new_rack = list(rack)
-                    new_rack.pop(rack.index("*"))
-                    new_node = self.nodes[node][letter][0]
-                    if self.nodes[node][letter][1] and \
-                            (len(word) == 1 or word[1] in ["*", " "] or isinstance(word[1], set)):
-                        rtn += letter.lower()
-                    if len(word) > 1:
-                        tmp = self.find_right_side(word[1:], new_rack, new_node, right_side=True)
-                        rtn += [letter.lower() + i for i in tmp]
+                slot = ord(letter) - 65
+                # the rack is checked before the node, it's the cheaper of the two
+                if (blanks == 0 and (slot > 25 or counts[slot] == 0)) or letter not in edges:
+                    continue
+                new_node, terminal = edges[letter]
+                if counts[slot] > 0:
+                    counts[slot] -= 1
+                    word.append(letter)
+                    if terminal and can_end:
+                        words.append("".join(word))
+                    if i + 1 < len(line):
+                        self._right_side(line, i + 1, counts, new_node, True, word, words)
+                    word.pop()
+                    counts[slot] += 1
+                if blanks > 0:
+                    counts[BLANK_SLOT] -= 1
+                    word.append(letter.lower())
+                    if terminal and can_end:
+                        words.append("".join(word))
+                    if i + 1 < len(line):
+                        self._right_side(line, i + 1, counts, new_node, True, word, words)
+                    word.pop()
+                    counts[BLANK_SLOT] += 1
+        else:
+            letter = line[i]
+            slot = ord(letter) - 65 if letter.isupper() else BLANK_SLOT
+            if counts[slot] == 0:
+                raise ValueError("{0} is not in the rack".format(letter if letter.isupper() else "*"))
+            edges = self.nodes[node]
+            if letter.upper() not in edges:
+                # the tiles already on the board don't start any word, which can happen with a DAWG of a few words
+                return
+            counts[slot] -= 1
+            word.append(letter)
+            self._right_side(line, i + 1, counts, edges[letter.upper()][0], False, word, words)
+            word.pop()
+            counts[slot] += 1
 
-            return rtn
+
+class GADDAG(DAWG):
+    """a DAWG of every word split at each of its letters (Gordon 1994), the letters up to the split are
+    reversed and followed by SEPARATOR, then the rest of the word follows. a move can then be built
+    outwards from its anchor instead of trying every left part first.
+    the nodes are always kept in CompactNodes as the structure is around 8 times the size of a DAWG"""
+    magic = b"GDAG"
+    extension = ".gaddag"
+    SEPARATOR = "["
+
+    def __init__(self, strings, compact=True):
+        gaddag_strings = []
+        for string in strings:
+            for i in range(1, len(string)):
+                gaddag_strings.append(string[i - 1::-1] + self.SEPARATOR + string[i:])
+            # a word reversed from its last letter has nothing after the split, so it needs no separator
+            gaddag_strings.append(string[::-1])
+        super().__init__(gaddag_strings, compact=True)
+
+    def contains(self, string):
+        return super().contains(string[::-1])
+
+
+class AnagramIndex:
+    """maps the signature of a word, its letters in sorted order, to every word with those letters.
+    a rack's anagrams are then one dict lookup instead of a walk over each order of its letters.
+    the signatures are also kept sorted, so the letters that can follow a signature's start are found by
+    bisecting, and a blank only tries the letters some signature has next instead of all 26"""
+    magic = b"ANAG"
+    extension = ".anagrams"
+
+    def __init__(self, strings, compact=False):
+        # compact is taken so the index can be loaded like a DAWG, it doesn't change anything
+        self.signatures = {}  # signature -> tuple of words
+        for string in strings:
+            if string == "":
+                continue
+            signature = "".join(sorted(string))
+            words = self.signatures.get(signature, ())
+            if string not in words:
+                self.signatures[signature] = words + (string,)
+        self.sorted_signatures = sorted(self.signatures.keys())
+
+    def save(self, file_name, fingerprint=bytes(20)):
+        # writes a header and then a line of "signature word word..." for each signature, in sorted order
+        lines = "".join([" ".join((signature,) + self.signatures[signature]) + "\n"
+                         for signature in self.sorted_signatures]).encode()
+        header = struct.pack(DICTIONARY_HEADER, self.magic, DICTIONARY_VERSION, fingerprint,
+                             len(self.sorted_signatures), sum([len(i) for i in self.signatures.values()]))
+        file, temporary_name = temporary_file(file_name)
+        try:
+            file.write(header)
+            file.write(lines)
+        except BaseException:
+            file.close()
+            os.remove(temporary_name)
+            raise
+        replace_file(file, temporary_name, file_name)
+
+    @classmethod
+    def load(cls, file_name):
+        file = open(file_name, "rb")
+        data = file.read()
+        file.close()
+        magic, version, fingerprint, signature_count, word_count = struct.unpack_from(DICTIONARY_HEADER, data)
+        if magic != cls.magic or version != DICTIONARY_VERSION:
+            raise ValueError("{0} is not a version {1} {2} file".format(file_name, DICTIONARY_VERSION, cls.__name__))
+        lines = data[struct.calcsize(DICTIONARY_HEADER):].decode().split("\n")[:-1]
+        if len(lines) != signature_count:
+            raise ValueError("{0} is truncated".format(file_name))
+        index = cls.__new__(cls)
+        index.signatures = {}
+        index.sorted_signatures = []
+        for line in lines:
+            words = line.split(" ")
+            index.signatures[words[0]] = tuple(words[1:])
+            index.sorted_signatures.append(words[0])
+        index.fingerprint = fingerprint
+        return index
+
+    def anagrams(self, letters):
+        # returns (word, blanks) for each word made of exactly letters, "*" is a blank and blanks is
+        # the letters the blanks stand for, in sorted order
+        if "*" not in letters:
+            return [(word, "") for word in self.signatures.get("".join(sorted(letters)), ())]
+        return self.find(letters, min_length=len(letters), max_length=len(letters))
+
+    def bingos(self, rack, board_letters=()):
+        # returns (word, blanks) for the 7 letter words using the whole rack and the 8 letter words
+        # using the whole rack and one of board_letters
+        if len(rack) != 7:
+            return []
+        words = self.anagrams(rack)
+        for letter in sorted(set([i.upper() for i in board_letters])):
+            words += self.anagrams(list(rack) + [letter])
+        return words
+
+    def find(self, rack, board_letters=(), max_board=0, min_length=2, max_length=15):
+        # returns (word, blanks) for every word made from tiles in rack and up to max_board of board_letters.
+        # letters are taken from the rack first, then the board, and blanks last, so each word is found once
+        rack_counts, board_counts = {}, {}
+        for letter in rack:
+            if letter != "*":
+                rack_counts[letter] = rack_counts.get(letter, 0) + 1
+        for letter in board_letters:
+            board_counts[letter.upper()] = board_counts.get(letter.upper(), 0) + 1
+        words = []
+        self.extend("", rack_counts, board_counts, max_board, list(rack).count("*"), "", min_length, max_length,
+                    words)
+        return words
+
+    def extend(self, signature, rack, board, board_left, blanks, blank_letters, min_length, max_length, words):
+        # adds the words of signature and goes on to each longer signature starting with it
+        if len(signature) >= min_length:
+            words += [(word, blank_letters) for word in self.signatures.get(signature, ())]
+        if len(signature) == max_length:
+            return
+        last = signature[-1] if len(signature) > 0 else "A"
+        # letters before the last one can't be used any more, as a signature's letters are in order
+        usable = blanks + sum([count for letter, count in rack.items() if letter >= last]) + \
+            min(board_left, sum([count for letter, count in board.items() if letter >= last]))
+        if len(signature) + usable < min_length:
+            return
+        if blanks > 0:
+            letters = self.next_letters(signature)
+        else:
+            # without a blank only the letters in hand can come next, each is checked with one bisect
+            letters = [letter for letter in sorted(set([i for i in rack.keys() if rack[i] > 0] +
+                                                       [i for i in board.keys() if board[i] > 0 and board_left > 0]))
+                       if letter >= last and self.starts(signature + letter)]
+        for letter in letters:
+            if rack.get(letter, 0) > 0:
+                rack[letter] -= 1
+                self.extend(signature + letter, rack, board, board_left, blanks, blank_letters, min_length,
+                            max_length, words)
+                rack[letter] += 1
+            elif board_left > 0 and board.get(letter, 0) > 0:
+                board[letter] -= 1
+                self.extend(signature + letter, rack, board, board_left - 1, blanks, blank_letters, min_length,
+                            max_length, words)
+                board[letter] += 1
+            elif blanks > 0:
+                self.extend(signature + letter, rack, board, board_left, blanks - 1, blank_letters + letter,
+                            min_length, max_length, words)
+
+    def starts(self, prefix):
+        # if any signature starts with prefix
+        i = bisect.bisect_left(self.sorted_signatures, prefix)
+        return i < len(self.sorted_signatures) and self.sorted_signatures[i][:len(prefix)] == prefix
+
+    def next_letters(self, signature):
+        # returns the letters that come after signature in the longer signatures starting with it,
+        # jumping past every signature with the same next letter
+        letters = []
+        signatures = self.sorted_signatures
+        start = len(signature)
+        i = bisect.bisect_left(signatures, signature)
+        while i < len(signatures) and signatures[i][:start] == signature:
+            if len(signatures[i]) == start:
+                i += 1
+                continue
+            letter = signatures[i][start]
+            letters.append(letter)
+            i = bisect.bisect_left(signatures, signature + chr(ord(letter) + 1), i)
+        return letters
+
+
+def anchor_tasks(lines, anchors=None):
+    # returns (line index, anchor position, position of the anchor before it or -1) for each anchor in lines,
+    # in the order find_words goes through them, only for the anchors (x, y) in anchors if given
+    tasks = []
+    for line, index in zip(lines, range(len(lines))):
+        previous = -1
+        for position in range(len(line)):
+            if isinstance(line[position], set):
+                anchor = (position, index // 2) if index % 2 == 0 else (index // 2, position)
+                if anchors is None or anchor in anchors:
+                    tasks.append((index, position, previous))
+                previous = position
+    return tasks
+
+
+class MoveBound:
+    """the most any move whose leftmost anchor is a given one could score on board. each run of empty squares
+    the move could cover is tried, with the rack's highest values on its best letter squares, all of its word
+    squares multiplying the word, the best words its squares could cross and 50 if it takes the whole rack.
+    it's never below a real score, so an anchor whose bound is below the score to beat doesn't need searching"""
+
+    def __init__(self, board, rack, scorer):
+        self.board = board
+        self.rack = set(rack)
+        self.rack_size = len(rack)
+        self.tile_values = scorer.values
+        self.letter_multipliers = scorer.layout.letter_multipliers
+        self.word_multipliers = scorer.layout.word_multipliers
+        # blanks are worth nothing
+        self.values = sorted([self.tile_values.get(tile, 0) for tile in rack], reverse=True)
+        self.crossing = {}  # (x, y, horizontal?) -> value of the tiles crossing the square, or None
+
+    def anchor(self, lines, task):
+        # the bound for task, from anchor_tasks
+        index, position, previous = task
+        line, horizontal, number = lines[index], index % 2 == 0, index // 2
+        left_side = line[previous + 1:position]
+        if len(left_side) > 0 and left_side[-1] == " ":
+            # all but one of the rack's tiles can go before the anchor
+            left_squares, left_tiles = min(len(left_side), self.rack_size - 1), 0
+        else:
+            left_squares, left_tiles = 0, sum([self.tile_values.get(i, 0) for i in left_side])
+        bound = 0
+        for left in range(left_squares + 1):
+            squares, tiles = [(i, None) for i in range(position - left, position)], left_tiles
+            i = position
+            while i < len(line) and len(squares) < self.rack_size:
+                if isinstance(line[i], set):
+                    letters = [self.tile_values.get(j, 0) for j in line[i].intersection(self.rack)]
+                    if len(letters) == 0 and "*" not in self.rack:
+                        # nothing on the rack fits
+                        break
+                    squares.append((i, max(letters) if len(letters) > 0 else 0))
+                else:
+                    squares.append((i, None))
+                i += 1
+                while i < len(line) and not isinstance(line[i], set) and line[i] not in [" ", "*"]:
+                    tiles += self.tile_values.get(line[i], 0)
+                    i += 1
+                bound = max(bound, self.window(squares, tiles, horizontal, number))
+        return bound
+
+    def window(self, squares, tiles, horizontal, number):
+        # the bound for covering squares, (position, best value that fits there or None), in line number
+        # along with tiles worth tiles
+        indexes = [number * 15 + i if horizontal else i * 15 + number for i, best in squares]
+        letter = sorted([self.letter_multipliers[i] for i in indexes], reverse=True)
+        value = tiles + sum([i * j for i, j in zip(self.values, letter)])
+        for i in indexes:
+            value *= self.word_multipliers[i]
+        for (i, best), square in zip(squares, indexes):
+            crossing = self.cross_tiles(i, number, horizontal)
+            if crossing is not None:
+                best = self.values[0] if best is None else best
+                value += (crossing + best * self.letter_multipliers[square]) * self.word_multipliers[square]
+        return value + 50 if len(squares) == 7 else value
+
+    def cross_tiles(self, i, number, horizontal):
+        # the value of the tiles crossing square i of the line, or None if there aren't any
+        x, y = (i, number) if horizontal else (number, i)
+        if (x, y, horizontal) not in self.crossing:
+            dx, dy = (0, 1) if horizontal else (1, 0)
+            tiles, length = 0, 0
+            for step in (-1, 1):
+                j, k = x + dx * step, y + dy * step
+                while 0 <= j < 15 and 0 <= k < 15 and self.board[k][j] != " ":
+                    tiles += self.tile_values.get(self.board[k][j], 0)
+                    length += 1
+                    j, k = j + dx * step, k + dy * step
+            self.crossing[(x, y, horizontal)] = tiles if length > 0 else None
+        return self.crossing[(x, y, horizontal)]
+
+
+class TopMoves:
+    """the k best (word, root, horizontal?, score) added so far, in a heap with the worst on top.
+    each move is added with an order, and of moves with the same score the lowest order is kept,
+    so the moves are the same as the first k of a stable sort of every move in that order"""
+
+    def __init__(self, k=1):
+        self.k = k
+        self.heap = []  # (score, -order, move)
+        self.floor = None  # a score k moves still to be added are known to reach
+
+    def add(self, order, move):
+        entry = (move[3], -order, move)
+        if len(self.heap) < self.k:
+            heapq.heappush(self.heap, entry)
+        elif self.k > 0 and entry[:2] > self.heap[0][:2]:
+            heapq.heapreplace(self.heap, entry)
+
+    def expect(self, scores):
+        # scores of moves the search is sure to add later, if there are k of them the worst of the k best
+        # is a score to beat before they turn up
+        scores = sorted(scores, reverse=True)
+        if len(scores) >= self.k > 0:
+            self.floor = scores[self.k - 1]
+
+    def threshold(self):
+        # the score a move needs to get in, None while there's still room and no floor
+        if len(self.heap) >= self.k > 0:
+            return self.heap[0][0] if self.floor is None else max(self.heap[0][0], self.floor)
+        return self.floor
+
+    def moves(self):
+        # best first
+        return [move for order, move in self.ordered_moves()]
+
+    def ordered_moves(self):
+        # (order, move) best first
+        return [(-entry[1], entry[2]) for entry in sorted(self.heap, key=lambda x: (-x[0], -x[1]))]
+
+
+def stream_moves(generator, lines, rack, board, scorer, top=None, anchors=None, stats=None):
+    # yields (order, (word, root, horizontal?, score)) for the moves generator.anchor_words finds, where order is
+    # the anchor's line and position and then the move's place in its list, the order find_words finds them in.
+    # it doesn't depend on which anchors are searched, so orders from searches of different anchors can be compared.
+    # anchors are searched from the highest MoveBound down, and once top has its k moves the search stops at the
+    # first anchor that can't beat the worst of them.
+    # stats get the generator's phases and nodes visited too, and are added even if the moves aren't all used
+    t0 = time.perf_counter()
+    tasks = anchor_tasks(lines, anchors)
+    move_bound = MoveBound(board, rack, scorer)
+    tasks = sorted([(move_bound.anchor(lines, task), task[0] << 8 | task[1], task) for task in tasks],
+                   key=lambda x: -x[0])
+    bound_time, scoring_time = time.perf_counter() - t0, 0.0
+    times, visits = [0.0] * len(generator.phases), generator.nodes_visited()
+    searched, candidates = 0, 0
+    try:
+        for bound, number, task in tasks:
+            threshold = None if top is None else top.threshold()
+            if threshold is not None and bound < threshold:
+                break
+            words = generator.anchor_words(lines, task, rack, times)
+            t0 = time.perf_counter()
+            moves = BotV1.score_words(words, board, scorer)
+            scoring_time += time.perf_counter() - t0
+            searched += 1
+            candidates += len(moves)
+            for move, index in zip(moves, range(len(moves))):
+                yield number << 32 | index, move
+    finally:
+        if stats is not None:
+            stats.add_time("move_bounds", bound_time)
+            for phase, seconds in zip(generator.phases, times):
+                stats.add_time(phase, seconds)
+            stats.add_time("scoring", scoring_time)
+            # other bots sharing the dictionary at the same time are counted too
+            stats.count("nodes_visited", generator.nodes_visited() - visits)
+            stats.count("anchors_searched", searched)
+            stats.count("anchors_pruned", len(tasks) - searched)
+            stats.count("candidates", candidates)
+
+
+class DAWGMoveGenerator:
+    """the move search from Appel and Jacobson, every left part of a word is found with find_left_side
+    and then extended across the anchor with find_right_side"""
+    phases = ["left_part", "right_extension"]  # the times anchor_words adds to
+
+    def __init__(self, dawg):
+        self.DAWG = dawg
+
+    def nodes_visited(self):
+        return self.DAWG.visits
+
+    def find_words(self, lines, rack, anchors=None, stats=None):
+        # lines are the 15 rows and 15 columns of the board, in turn, with anchors as sets of their possible letters
+        # returns a list of (word, root, horizontal?), only for words whose leftmost anchor is in anchors if given
+        # and adds the time taken and nodes visited to stats if given
+        t0 = time.perf_counter()
+        tasks = anchor_tasks(lines, anchors)
+        split_time = time.perf_counter() - t0
+        times, visits = [0.0] * len(self.phases), self.nodes_visited()
+        words = []  # (word, root, horizontal?)
+        for task in tasks:
+            words += self.anchor_words(lines, task, rack, times)
+        if stats is not None:
+            stats.add_time("line_splitting", split_time)
+            for phase, seconds in zip(self.phases, times):
+                stats.add_time(phase, seconds)
+            # other bots sharing the dictionary at the same time are counted too
+            stats.count("nodes_visited", self.nodes_visited() - visits)
+            stats.count("candidates", len(words))
+        return words
+
+    def anchor_words(self, lines, task, rack, times=None):
+        # returns the (word, root, horizontal?) whose leftmost anchor is task, from anchor_tasks,
+        # and adds the time taken by the left and right parts to times if given
+        index, position, previous = task
+        line, horizontal = lines[index], index % 2 == 0
+        anchor = (position, index // 2) if horizontal else (index // 2, position)
+        left_side, right_side = line[previous + 1:position], line[position:]
+        t0 = time.perf_counter()
+        words = []
+        if len(left_side) == 0:
+            # if left_side is empty
+            new_words = self.DAWG.find_right_side(right_side, list(rack))
+            words += [(word, anchor, horizontal) for word in new_words]
+        elif left_side[-1] == " ":
+            # if left_side is all blank
+            left_sides = self.DAWG.find_left_side(list(rack), len(left_side))
+            t1 = time.perf_counter()
+            if times is not None:
+                times[0] += t1 - t0
+            t0 = t1
+            for left in left_sides:
+                if horizontal:
+                    root = (anchor[0] - len(left), anchor[1])
+                else:
+                    root = (anchor[0], anchor[1] - len(left))
+                new_words = self.DAWG.find_right_side(list(left) + right_side, list(rack))
+                words += [(word, root, horizontal) for word in new_words]
         else:
-            rack = list(rack)
-            if word[0].isupper():
-                rack.pop(rack.index(word[0]))
+            # if left_side is all tiles
+            if horizontal:
+                root = (anchor[0] - len(left_side), anchor[1])
             else:
-                rack.pop(rack.index("*"))
-            node = self.nodes[node][word[0].upper()][0]
-            rtn = self.find_right_side(word[1:], rack, node=node, right_side=right_side)
-            return [word[0] + i for i in rtn]
+                root = (anchor[0], anchor[1] - len(left_side))
+            new_rack = list(rack) + ["*" if i.islower() else i for i in left_side]
+            new_words = self.DAWG.find_right_side(left_side + right_side, new_rack)
+            words += [(word, root, horizontal) for word in new_words]
+        if times is not None:
+            times[1] += time.perf_counter() - t0
+        return words
+
+    def iter_moves(self, lines, rack, board, scorer, top=None, anchors=None, stats=None):
+        # scored moves one anchor at a time, see stream_moves
+        return stream_moves(self, lines, rack, board, scorer, top, anchors, stats)
+
+
+class GADDAGMoveGenerator:
+    """finds the same moves as DAWGMoveGenerator but with a GADDAG, each word is grown left from its
+    anchor and then right after the separator, so left parts that can't reach the anchor are never tried.
+    the squares before an anchor are used the same way as the DAWG search: up to the previous anchor
+    with at least one rack tile, or exactly the tiles already there"""
+    phases = ["gaddag_search"]  # the left and right parts are found together so they're timed as one
+
+    def __init__(self, gaddag):
+        self.GADDAG = gaddag
+        self.separator = ord(GADDAG.SEPARATOR) - ord("A")
+        self.visits = 0  # calls of child, for TurnStats
+
+    def nodes_visited(self):
+        return self.visits
+
+    def find_words(self, lines, rack, anchors=None, stats=None):
+        # same input and output as DAWGMoveGenerator.find_words
+        times, visits = [0.0] * len(self.phases), self.nodes_visited()
+        words = []
+        for task in anchor_tasks(lines, anchors):
+            words += self.anchor_words(lines, task, rack, times)
+        if stats is not None:
+            for phase, seconds in zip(self.phases, times):
+                stats.add_time(phase, seconds)
+            stats.count("nodes_visited", self.nodes_visited() - visits)
+            stats.count("candidates", len(words))
+        return words
+
+    def anchor_words(self, lines, task, rack, times=None):
+        # returns the (word, root, horizontal?) whose leftmost anchor is task, from anchor_tasks,
+        # and adds the time taken to times if given
+        t0 = time.perf_counter()
+        index, position, previous = task
+        self.words = []
+        self.rack = {"*": 0}
+        for letter in rack:
+            self.rack[letter] = self.rack.get(letter, 0) + 1
+        self.line, self.anchor = lines[index], position
+        self.left_side = self.line[previous + 1:position]
+        self.line_number, self.horizontal = index // 2, index % 2 == 0
+        # places the anchor's letter, then goes left
+        for letter, node, terminal in self.place(0, self.line[position]):
+            self.go_left(node, terminal, [letter])
+        words = self.words
+        self.words, self.line = [], None
+        if times is not None:
+            times[0] += time.perf_counter() - t0
+        return words
+
+    def iter_moves(self, lines, rack, board, scorer, top=None, anchors=None, stats=None):
+        # scored moves one anchor at a time, see stream_moves
+        return stream_moves(self, lines, rack, board, scorer, top, anchors, stats)
+
+    def child(self, node, bit):
+        # returns the node along the edge for bit and if it ends a word, or None
+        self.visits += 1
+        nodes = self.GADDAG.nodes
+        mask = nodes.masks[node]
+        if not mask >> bit & 1:
+            return None
+        return nodes.edges[nodes.offsets[node] + bin(mask & ((1 << bit) - 1)).count("1")], nodes.terminals[node] >> bit & 1
+
+    def place(self, node, square):
+        # yields (letter, node, terminal) for each way a rack tile can be placed on square, blanks are lower case
+        # tiles already on the square have to be matched from the rack, as they are in DAWG.find_right_side
+        letters = square if square not in ["*", " "] else self.GADDAG.nodes[node].keys()
+        for letter in letters:
+            bit = ord(letter) - ord("A")
+            if not 0 <= bit < 26:
+                continue
+            edge = self.child(node, bit)
+            if edge is None:
+                continue
+            for tile in (letter, "*"):
+                if self.rack.get(tile, 0) > 0:
+                    self.rack[tile] -= 1
+                    yield letter if tile != "*" else letter.lower(), edge[0], edge[1]
+                    self.rack[tile] += 1
+
+    def go_left(self, node, terminal, left):
+        # left holds the letters from the anchor going left
+        if len(self.left_side) == 0:
+            self.go_right(node, terminal, left)
+        elif self.left_side[-1] == " ":
+            # rack tiles can go on the empty squares before the anchor, at least one is needed
+            if len(left) > 1:
+                self.go_right(node, terminal, left)
+            if len(left) <= len(self.left_side):
+                for letter, new_node, new_terminal in self.place(node, " "):
+                    self.go_left(new_node, new_terminal, left + [letter])
+        else:
+            # follows the tiles already before the anchor
+            for tile in reversed(self.left_side):
+                edge = self.child(node, ord(tile.upper()) - ord("A"))
+                if edge is None:
+                    return
+                node, terminal = edge
+                left = left + [tile]
+            self.go_right(node, terminal, left)
+
+    def go_right(self, node, terminal, left):
+        # the word can end at the anchor, else it crosses the separator and is extended to the right
+        if terminal and self.can_end(self.anchor):
+            self.add_word(left, [])
+        edge = self.child(node, self.separator)
+        if edge is not None:
+            self.extend_right(edge[0], self.anchor + 1, left, [])
+
+    def extend_right(self, node, position, left, right):
+        if position >= len(self.line):
+            return
+        for letter, new_node, terminal in self.place(node, self.line[position]):
+            if terminal and self.can_end(position):
+                self.add_word(left, right + [letter])
+            self.extend_right(new_node, position + 1, left, right + [letter])
+
+    def can_end(self, position):
+        # a word can only end if the square after it isn't a tile
+        return position + 1 == len(self.line) or self.line[position + 1] in ["*", " "] or \
+            isinstance(self.line[position + 1], set)
+
+    def add_word(self, left, right):
+        start = self.anchor - len(left) + 1
+        root = (start, self.line_number) if self.horizontal else (self.line_number, start)
+        self.words.append(("".join(reversed(left)) + "".join(right), root, self.horizontal))
+
+
+class Board:
+    """a 15x15 board kept as a flat bytearray of letters indexed by y * 15 + x, with b" " for an empty square,
+    and a bitmask of the occupied squares of each row and each column. board[y] is row y as a string,
+    so board[y][x] reads the same as the lists of lists used elsewhere, squares are changed with set or apply"""
+    full = (1 << 15) - 1
+    _bits = bytes([48 if i == 32 else 49 for i in range(256)])  # maps a line to "0" for empty and "1" for a tile
+
+    def __init__(self, rows=None):
+        # rows is 15 rows of 15 letters, as lists or strings, or one string of all 225 letters
+        self.squares = bytearray(b" " * 225)
+        self.rows = [0] * 15  # bit x is set if (x, y) has a tile
+        self.columns = [0] * 15  # bit y is set if (x, y) has a tile
+        if rows is not None:
+            if not isinstance(rows, str):
+                rows = "".join(["".join(row) for row in rows])
+            self.squares[:] = rows.encode("latin-1")
+            if len(self.squares) != 225:
+                raise ValueError("a board needs 225 squares, not {0}".format(len(self.squares)))
+            # reversed so the first square of the line is the lowest bit
+            self.rows = [int(self.squares[y * 15:y * 15 + 15].translate(self._bits)[::-1], 2) for y in range(15)]
+            self.columns = [int(self.squares[x::15].translate(self._bits)[::-1], 2) for x in range(15)]
+
+    def __getitem__(self, y):
+        return self.squares[y * 15:y * 15 + 15].decode("latin-1")
+
+    def __iter__(self):
+        return iter([self[y] for y in range(15)])
+
+    def __len__(self):
+        return 15
+
+    def __eq__(self, other):
+        # other is a Board or a list of rows, anything else is left to Python
+        if isinstance(other, list):
+            try:
+                other = Board(other)
+            except (ValueError, TypeError):
+                return False
+        if not isinstance(other, Board):
+            return NotImplemented
+        return self.squares == other.squares
+
+    __hash__ = None
+
+    def get(self, x, y):
+        return chr(self.squares[y * 15 + x])
+
+    def set(self, x, y, letter):
+        self.squares[y * 15 + x] = ord(letter)
+        if letter == " ":
+            self.rows[y] &= ~(1 << x)
+            self.columns[x] &= ~(1 << y)
+        else:
+            self.rows[y] |= 1 << x
+            self.columns[x] |= 1 << y
+
+    def occupied(self, x, y):
+        return self.rows[y] >> x & 1 == 1
+
+    def copy(self):
+        board = Board.__new__(Board)
+        board.squares = bytearray(self.squares)
+        board.rows = list(self.rows)
+        board.columns = list(self.columns)
+        return board
+
+    def apply(self, squares, letters):
+        # puts letters on squares (x, y) and returns what undo needs to take them off again
+        undo = []
+        for (x, y), letter in zip(squares, letters):
+            undo.append((x, y, self.get(x, y)))
+            self.set(x, y, letter)
+        return undo
+
+    def undo(self, undo):
+        for x, y, letter in reversed(undo):
+            self.set(x, y, letter)
+
+    def to_string(self):
+        return self.squares.decode("latin-1")
+
+    def to_lists(self):
+        return [list(self[y]) for y in range(15)]
+
+    def difference(self, other):
+        # returns the squares (x, y) that are different on other, rows that are the same are skipped whole
+        squares = []
+        for y in range(15):
+            start = y * 15
+            if self.squares[start:start + 15] != other.squares[start:start + 15]:
+                for x in range(15):
+                    if self.squares[start + x] != other.squares[start + x]:
+                        squares.append((x, y))
+        return squares
+
+    def neighbour_mask(self, y):
+        # bitmask of the squares in row y that are next to a tile
+        occupied = self.rows[y]
+        near = (occupied << 1 | occupied >> 1) & self.full
+        if y > 0:
+            near |= self.rows[y - 1]
+        if y < 14:
+            near |= self.rows[y + 1]
+        return near
+
+    def anchor_mask(self, y):
+        # bitmask of the empty squares in row y that are next to a tile
+        return self.neighbour_mask(y) & ~self.rows[y]
+
+    def is_anchor(self, x, y):
+        return self.anchor_mask(y) >> x & 1 == 1
+
+    def touches(self, squares):
+        # if any of the squares (x, y) is next to a tile
+        for x, y in squares:
+            if self.neighbour_mask(y) >> x & 1:
+                return True
+        return False
+
+
+class BoardLayout:
+    """the premium squares of a board, the multipliers are kept in flat lists indexed by y * 15 + x.
+    layouts are read from layouts.json, where each bonus is a list of [x, y] squares,
+    and each one is only built once then shared by every host and bot"""
+    _layouts = {}
+    _lock = threading.Lock()
+
+    def __init__(self, bonus_tiles):
+        self.bonus_tiles = bonus_tiles
+        self.letter_multipliers = [1] * 225
+        self.word_multipliers = [1] * 225
+        for bonus, grid, multiplier in [("DL", self.letter_multipliers, 2), ("TL", self.letter_multipliers, 3),
+                                        ("DW", self.word_multipliers, 2), ("TW", self.word_multipliers, 3)]:
+            for x, y in bonus_tiles.get(bonus, []):
+                grid[y * 15 + x] = multiplier
+
+    @classmethod
+    def load(cls, name="standard", file_name="layouts.json"):
+        with cls._lock:
+            if (file_name, name) not in cls._layouts:
+                file = open(file_name, "r")
+                bonus_tiles = json.loads("".join(file.readlines()))[name]
+                file.close()
+                cls._layouts[(file_name, name)] = cls(bonus_tiles)
+            return cls._layouts[(file_name, name)]
+
+    def letter_multiplier(self, x, y):
+        return self.letter_multipliers[y * 15 + x]
+
+    def word_multiplier(self, x, y):
+        return self.word_multipliers[y * 15 + x]
 
 
 class TilePool:
-    def __init__(self, lang):
-        file = open("tiles.json", "r")
-        tiles = json.loads("".join(file.readlines()))[lang]
-        file.close()
-        self.tiles = []
-        for i in tiles.items():
-            for j in range(i[1][0]):
-                self.tiles.append(i[0])
-        self.values = {}
-        for i in tiles.items():
-            self.values[i[0]] = i[1][1]
+    """the bag of tiles for one game, it is shuffled once when it's made and tiles are taken off the end.
+    all the randomness comes from rng, so a game with the same seed deals the same tiles"""
+    _tile_sets = {}  # lang -> (tiles, values), tiles.json is only read once per process
+    _lock = threading.Lock()
+
+    def __init__(self, lang, rng=None):
+        tiles, values = self.tile_set(lang)
+        self.random = random.Random() if rng is None else rng
+        self.tiles = list(tiles)
+        self.random.shuffle(self.tiles)
+        self.values = values
+
+    @classmethod
+    def tile_set(cls, lang, file_name="tiles.json"):
+        # returns the list of every tile and the dict of their values for lang
+        with cls._lock:
+            if (file_name, lang) not in cls._tile_sets:
+                file = open(file_name, "r")
+                tiles = json.loads("".join(file.readlines()))[lang]
+                file.close()
+                bag = []
+                for i in tiles.items():
+                    for j in range(i[1][0]):
+                        bag.append(i[0])
+                values = {}
+                for i in tiles.items():
+                    values[i[0]] = i[1][1]
+                cls._tile_sets[(file_name, lang)] = (tuple(bag), values)
+            return cls._tile_sets[(file_name, lang)]
 
     def take(self, count):
-        # takes tiles from tile pool ///(what if count > tile pool size)
-        rtn = []
-        if count > self.count:
-            count = self.count
-        for i in range(count):
-            num = random.randint(0, len(self.tiles) - 1)
-            rtn.append(self.tiles.pop(num))
+        # takes tiles from tile pool, or all of them if there are less than count
+        count = min(count, self.count)
+        rtn = self.tiles[len(self.tiles) - count:]
+        del self.tiles[len(self.tiles) - count:]
         return rtn
 
     def draw(self, count):
         # returns a list of random tiles from the pool without taking them
-        rtn = set()
-        while len(rtn) < count:
-            rtn.add(random.randint(0, len(self.tiles) - 1))
-        rtn = list(rtn)
-        for i in range(len(rtn)):
-            rtn[i] = self.tiles[rtn[i]]
-        random.shuffle(rtn)
-        return rtn
+        return self.random.sample(self.tiles, count)
 
     def swap(self, tiles):
-        # swaps a set of tiles
-        count = len(tiles)
-        self.tiles += tiles
-        tiles = self.take(count)
-        return tiles
+        # swaps a set of tiles, the new tiles are taken first and then the old ones are put back in random places.
+        # the pool has to have as many tiles as are swapped, or fewer would come back
+        assert len(tiles) <= self.count, "swapping {0} tiles from a pool of {1}".format(len(tiles), self.count)
+        new_tiles = self.take(len(tiles))
+        for tile in tiles:
+            # putting each tile at a random place and moving the tile that was there to the end
+            # keeps the bag shuffled
+            index = self.random.randint(0, len(self.tiles))
+            self.tiles.append(tile)
+            self.tiles[index], self.tiles[-1] = self.tiles[-1], self.tiles[index]
+        return new_tiles
 
     def get_value(self, word):
         value = 0
@@ -177,41 +1303,160 @@ class TilePool:
         return len(self.tiles)
 
 
+class PlacementScorer:
+    """scores tiles placed on a board from the tile values and premium squares. a Host keeps one for its game,
+    and bots and search workers score their moves with one too"""
+
+    def __init__(self, values, layout):
+        self.values = values  # letter -> value, blanks are lower case and worth nothing
+        self.layout = layout
+
+    def score_placement(self, squares, letters, board):
+        # scores new tiles placed on squares (x, y) of board, only the word along the tiles and the words
+        # crossing each tile are looked at, so the rest of the board isn't scanned
+        new_tiles = dict(zip(squares, letters))
+        horizontal = len(squares) == 1 or squares[0][1] == squares[-1][1]
+        direction = (1, 0) if horizontal else (0, 1)
+        value = self.score_line(board, new_tiles, squares[0], direction)
+        for square in squares:
+            value += self.score_line(board, new_tiles, square, (direction[1], direction[0]))
+        # 50 point bonus for using 7 tiles
+        if len(squares) == 7:
+            value += 50
+        return value
+
+    def score_line(self, board, new_tiles, square, direction):
+        # scores the word through square along direction, or 0 if it is a single letter
+        x, y = square
+        dx, dy = direction
+        # goes back to the start of the word
+        while x - dx >= 0 and y - dy >= 0 and (board[y - dy][x - dx] != " " or (x - dx, y - dy) in new_tiles):
+            x, y = x - dx, y - dy
+        value, multiplier, length = 0, 1, 0
+        while x < 15 and y < 15:
+            if (x, y) in new_tiles:
+                # bonuses only apply to new tiles
+                value += self.values.get(new_tiles[(x, y)], 0) * self.layout.letter_multipliers[y * 15 + x]
+                multiplier *= self.layout.word_multipliers[y * 15 + x]
+            elif board[y][x] != " ":
+                value += self.values.get(board[y][x], 0)
+            else:
+                break
+            length += 1
+            x, y = x + dx, y + dy
+        return value * multiplier if length > 1 else 0
+
+
+LOG_LEVELS = {"debug": 10, "info": 20, "warning": 30, "error": 40, "off": 100}
+
+
+class GameLog:
+    """writes log records from a background thread so a game never waits on the disk.
+    a record is a dict, it's queued as it is and written later as one line of JSON (JSONL),
+    everything queued while the thread waits goes out in one write. records below level are dropped
+    before they are made, so debug records cost nothing when they are off"""
+
+    def __init__(self, file_name=None, level="info", batch_size=512, flush_interval=0.5):
+        # the default file is logs/<date and time>-<process id>.jsonl
+        self.file_name = file_name
+        self.level = LOG_LEVELS[level]
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.records = queue.Queue()
+        self.thread = None
+        self._lock = threading.Lock()
+
+    def set_level(self, level):
+        self.level = LOG_LEVELS[level]
+
+    def enabled(self, level):
+        return LOG_LEVELS[level] >= self.level
+
+    def write(self, level, event, **fields):
+        # queues a record of event with fields, which shouldn't be changed after they are passed in
+        if LOG_LEVELS[level] < self.level:
+            return
+        record = {"time": time.time(), "level": level, "event": event}
+        record.update(fields)
+        if self.thread is None:
+            with self._lock:
+                if self.thread is None:
+                    self.thread = threading.Thread(target=self.run, daemon=True)
+                    self.thread.start()
+        self.records.put_nowait(record)
+
+    def run(self):
+        file = None
+        stop = False
+        while not stop:
+            records = [self.records.get()]
+            # waits a little for more records so they are written together
+            deadline = time.monotonic() + self.flush_interval
+            while len(records) < self.batch_size and records[-1] is not None:
+                try:
+                    records.append(self.records.get(timeout=max(deadline - time.monotonic(), 0)))
+                except queue.Empty:
+                    break
+            if records[-1] is None:
+                # close() puts None in the queue to stop the thread
+                stop = True
+                records.pop()
+            if len(records) == 0:
+                continue
+            try:
+                if file is None:
+                    if self.file_name is None:
+                        self.file_name = "logs/{0}-{1}.jsonl".format(
+                            datetime.datetime.now().strftime("%d-%m-%Y-%H-%M-%S"), os.getpid())
+                    if os.path.dirname(self.file_name) != "":
+                        os.makedirs(os.path.dirname(self.file_name), exist_ok=True)
+                    file = open(self.file_name, "a")
+                file.write("".join([json.dumps(record) + "\n" for record in records]))
+                file.flush()
+            except OSError as error:
+                print("couldn't write {0} log records: {1}".format(len(records), error), file=sys.stderr)
+        if file is not None:
+            file.close()
+
+    def close(self):
+        # writes everything queued so far and stops the thread, a later write starts it again
+        with self._lock:
+            if self.thread is not None:
+                self.records.put_nowait(None)
+                self.thread.join()
+                self.thread = None
+
+
+# the log every game in this process uses, SCRABBLE_LOG_LEVEL sets its level
+game_log = GameLog(level=os.environ.get("SCRABBLE_LOG_LEVEL", "info"))
+atexit.register(game_log.close)
+
+
 class Host(threading.Thread):
-    def __init__(self, host_player, lang="en"):
+    def __init__(self, host_player, lang="en", layout="standard", seed=None):
         super().__init__()
         self.playing = False
-        self.inputs = []
+        self.inputs = queue.Queue()  # [player, command] from PlayerHost.receive
         self._game_started = False
         self.players = []
         self.add_player(host_player)
         self.player_count = None
-        self.board = [[" " for j in range(15)] for i in range(15)]
+        self.board = Board()
         self.current_player = 0
         self.skip_counter = 0
-        self.bonus_tiles = {"DW": [(1, 1), (2, 2), (3, 3), (4, 4),
-                                   (13, 1), (12, 2), (11, 3), (10, 4),
-                                   (1, 13), (2, 12), (3, 11), (4, 10),
-                                   (13, 13), (12, 12), (11, 11), (10, 10)],
-                            "DL": [(0, 3), (0, 11), (2, 6), (2, 8), (3, 0), (3, 7), (3, 14),
-                                   (6, 2), (6, 6), (6, 8), (6, 12), (7, 3), (7, 11),
-                                   (8, 2), (8, 6), (8, 8), (8, 12),
-                                   (11, 0), (11, 7), (11, 14), (12, 6), (12, 8), (14, 3), (14, 11)],
-                            "TW": [(0, 0), (7, 0), (14, 0), (14, 7),
-                                   (14, 14), (7, 14), (0, 14), (0, 7)],
-                            "TL": [(1, 5), (1, 9), (5, 1), (5, 5), (5, 9), (5, 13),
-                                   (9, 1), (9, 5), (9, 9), (9, 13), (13, 5), (13, 9)]}
+        # premium squares, shared with every other game using the same layout
+        self.layout = BoardLayout.load(layout)
+        # every random choice in the game comes from this, so a game can be replayed from its seed and commands
+        self.seed = random.randrange(2 ** 32) if seed is None else seed
+        self.random = random.Random(self.seed)
+        self.commands = []  # [order, command] for every command played
         # gets tiles
-        self.tiles = TilePool(lang)
-        # gets words (possibly change to a GADDAG or DAWG)
-        self.words = []
-        if os.path.exists("Dictionaries/" + lang + ".txt"):
-            file = open("Dictionaries/" + lang + ".txt", "r")
-            self.words = file.readlines()
-            file.close()
-        for i in range(len(self.words)):
-            self.words[i] = self.words[i].replace("\n", "")
-        self.words = DAWG(self.words)
+        self.tiles = TilePool(lang, self.random)
+        self.scorer = PlacementScorer(self.tiles.values, self.layout)
+        self.log = game_log
+        self.debug_validation = False  # checks each placement against validating and scoring the whole board
+        # gets words from the dictionary shared by every game in this process
+        self.words = dictionaries.get(lang)
 
     def add_player(self, player):
         # add a player to the game
@@ -226,6 +1471,11 @@ class Host(threading.Thread):
             return False
 
     def start_game(self):
+        self.set_up_game()
+        # start game loop
+        self.start()
+
+    def set_up_game(self):
         # starting
         self._game_started = True
         self.player_count = len(self.players)
@@ -245,78 +1495,175 @@ class Host(threading.Thread):
 
         for player in self.players:
             player.send("tile_pool: {0}".format(self.tiles.count))
-        # start game loop
-        self.start()
 
     def run(self):
         self.game_loop()
 
+    def stop(self):
+        # ends the game loop from another thread
+        self.playing = False
+        self.inputs.put_nowait(None)
+
     def game_loop(self):
-        # waiting for response from player
+        # waiting for response from player, the thread sleeps on the queue until a command arrives
         self.playing = True
         while self.playing:
-            if len(self.inputs) > 0:
-                command = self.inputs.pop(0)
-                sender, command = command
-                if sender.order != self.current_player:
-                    continue
-                if command[:7] == "place: ":
-                    # splits incoming command
-                    board, rack = command[7:].split("/")
-                    board = list(board)
-                    board = [board[i * 15:i * 15 + 15] for i in range(15)]
-                    rack = list(rack)
-
-                    # plays turn if valid
-                    if self.is_valid_move(board):
-                        self.skip_counter = 0
-                        illegal_words = self.find_illegal_words(board)
-                        if len(illegal_words) != 0:
-                            sender.send("error2: {0}".format(illegal_words[0]))
-                            continue
-                        sender.score += self.calculate_score(board, rack)
-                        sender.tiles = list(rack) + self.tiles.take(7 - len(rack))
-                        sender.send("tiles: {0}".format("".join(sender.tiles)))
-                        self.current_player = (self.current_player + 1) % self.player_count
-                        self.set_board(board)
-                        for player in self.players:
-                            player.send("board: {0}".format("".join(["".join(i) for i in self.board])))
-                            player.send("score: {0}/{1}".format(sender.order, sender.score))
-                            player.send("tile_pool: {0}".format(self.tiles.count))
-                            player.send("current_player: {0}".format(self.current_player))
-                    else:
-                        sender.send("error1: oh no")
-                elif command[:6] == "pass: ":
-                    self.skip_counter += 1
-                    self.current_player = (self.current_player + 1) % self.player_count
-                    for player in self.players:
-                        player.send("board: {0}".format("".join(["".join(i) for i in self.board])))
-                        player.send("score: {0}/{1}".format(sender.order, sender.score))
-                        player.send("tile_pool: {0}".format(self.tiles.count))
-                        player.send("current_player: {0}".format(self.current_player))
-                elif command[:6] == "swap: ":
-                    self.skip_counter = 0
-                    self.current_player = (self.current_player + 1) % self.player_count
-                    tiles_to_swap = list(command[6:])
-                    for tile in tiles_to_swap:
-                        sender.tiles.pop(sender.tiles.index(tile))
-                    new_tiles = self.tiles.swap(tiles_to_swap)
-                    sender.tiles += new_tiles
-                    sender.send("tiles: {0}".format("".join(sender.tiles)))
-                    for player in self.players:
-                        player.send("board: {0}".format("".join(["".join(i) for i in self.board])))
-                        player.send("score: {0}/{1}".format(sender.order, sender.score))
-                        player.send("tile_pool: {0}".format(self.tiles.count))
-                        player.send("current_player: {0}".format(self.current_player))
-
-                print("completed {0}".format(command))
-                # end game when tile pool is empty and one player's rack is also empty
-                if self.tiles.count == 0 and 0 in [len(i.tiles) for i in self.players]:
-                    self.playing = False
-                # end game when each player skips twice
-                if self.skip_counter >= self.player_count * 2:
-                    self.playing = False
-        # after game
+            command = self.inputs.get()
+            if command is None:
+                # stop() puts None in the queue to wake the loop up
+                continue
+            self.handle_command(*command)
+        self.end_game()
+
+    def handle_command(self, sender, command):
+        # plays one command from a player
+        if command[:10] == "protocol: ":
+            # "protocol: delta" asks for only the squares that changed after each move instead of the whole board
+            sender.delta = command[10:] == "delta"
+            return
+        if sender.order != self.current_player:
+            return
+        self.commands.append([sender.order, command])
+        if command[:7] == "place: ":
+            # splits incoming command
+            board, rack = command[7:].split("/")
+            try:
+                board = Board(board)
+            except ValueError:
+                sender.send("error1: oh no")
+                return
+            squares = self.board.difference(board)
+            letters = [board.get(x, y) for x, y in squares]
+            if "*" in letters:
+                # blanks are placed as the lower case letter they stand for
+                sender.send("error3: blank")
+                return
+            if not self.play_placement(sender, squares, letters, list(rack)):
+                return
+        elif command[:6] == "move: ":
+            # a placement as "x,y,h or v,letters", blanks are lower case
+            placement = self.parse_move(command[6:])
+            rack = list(sender.tiles)
+            for letter in [] if placement is None else placement[1]:
+                tile = letter if letter.isupper() else "*"
+                if tile not in rack:
+                    placement = None
+                    break
+                rack.pop(rack.index(tile))
+            if placement is None:
+                sender.send("error1: oh no")
+            elif not self.play_placement(sender, placement[0], placement[1], rack):
+                return
+        elif command[:6] == "pass: ":
+            self.skip_counter += 1
+            self.current_player = (self.current_player + 1) % self.player_count
+            self.send_turn(sender)
+        elif command[:6] == "swap: ":
+            # the tiles have to be on the rack, a blank as "*", and the bag has to have as many to give back,
+            # before anything changes
+            tiles_to_swap = list(command[6:])
+            rack = list(sender.tiles) if len(tiles_to_swap) <= self.tiles.count else None
+            for tile in [] if rack is None else tiles_to_swap:
+                if tile not in rack:
+                    rack = None
+                    break
+                rack.pop(rack.index(tile))
+            if rack is None:
+                sender.send("error1: oh no")
+            else:
+                self.skip_counter = 0
+                self.current_player = (self.current_player + 1) % self.player_count
+                new_tiles = self.tiles.swap(tiles_to_swap)
+                sender.tiles = rack + new_tiles
+                sender.send("tiles: {0}".format("".join(sender.tiles)))
+                self.send_turn(sender)
+
+        self.log.write("debug", "completed", player=sender.order, command=command)
+        # end game when tile pool is empty and one player's rack is also empty
+        if self.tiles.count == 0 and 0 in [len(i.tiles) for i in self.players]:
+            self.playing = False
+        # end game when each player skips twice
+        if self.skip_counter >= self.player_count * 2:
+            self.playing = False
+
+    def play_placement(self, sender, squares, letters, rack):
+        # plays letters on squares (x, y) as sender's move, rack is what they have left after it.
+        # only the new tiles and the words they make are looked at, not the whole board.
+        # returns False if the words aren't allowed, so the command isn't finished
+        valid = self.is_valid_placement(squares)
+        illegal_words = self.find_illegal_placement_words(squares, letters) if valid else []
+        score = self.score_placement(squares, letters) if valid and len(illegal_words) == 0 else 0
+        if self.debug_validation:
+            self.check_placement(squares, letters, valid, illegal_words, score)
+        if valid:
+            self.skip_counter = 0
+            if len(illegal_words) != 0:
+                sender.send("error2: {0}".format(illegal_words[0]))
+                return False
+            sender.score += score
+            sender.tiles = list(rack) + self.tiles.take(7 - len(rack))
+            sender.send("tiles: {0}".format("".join(sender.tiles)))
+            self.current_player = (self.current_player + 1) % self.player_count
+            old_board = self.board
+            board = self.board.copy()
+            board.apply(squares, letters)
+            self.set_board(board)
+            self.send_turn(sender, old_board.difference(self.board))
+        else:
+            sender.send("error1: oh no")
+        return True
+
+    def check_placement(self, squares, letters, valid, illegal_words, score):
+        # debug check that validating and scoring the placement on its own agrees with the whole board
+        board = self.board.copy()
+        board.apply(squares, letters)
+        full_valid = len(squares) > 0 and self.is_valid_move(board)
+        if full_valid != valid:
+            raise RuntimeError("placement on {0} is {1} but the whole board is {2}".format(
+                squares, "valid" if valid else "invalid", "valid" if full_valid else "invalid"))
+        if valid and set(self.find_illegal_words(board)) != set(illegal_words):
+            raise RuntimeError("placement on {0} has illegal words {1} but the whole board has {2}".format(
+                squares, illegal_words, self.find_illegal_words(board)))
+        if valid and len(illegal_words) == 0 and self.calculate_score(board, None) != score:
+            raise RuntimeError("placement on {0} scores {1} but the whole board scores {2}".format(
+                squares, score, self.calculate_score(board, None)))
+
+    def parse_move(self, operand):
+        # turns "x,y,h or v,letters" into the squares and letters of the placement, or None if it doesn't fit.
+        # the letters go on the empty squares from (x, y) onwards, squares with tiles are stepped over
+        try:
+            x, y, direction, letters = operand.split(",")
+            x, y = int(x), int(y)
+        except ValueError:
+            return None
+        if direction not in ["h", "v"] or len(letters) == 0 or not letters.isalpha():
+            return None
+        dx, dy = (1, 0) if direction == "h" else (0, 1)
+        squares = []
+        for letter in letters:
+            while 0 <= x < 15 and 0 <= y < 15 and self.board.occupied(x, y):
+                x, y = x + dx, y + dy
+            if not (0 <= x < 15 and 0 <= y < 15):
+                return None
+            squares.append((x, y))
+            x, y = x + dx, y + dy
+        return squares, list(letters)
+
+    def send_turn(self, sender, squares=None):
+        # tells every player the board and the new score, tile pool and current player after sender's turn.
+        # players using deltas get the squares that changed, if any, instead of the board
+        for player in self.players:
+            if not player.delta:
+                player.send("board: {0}".format(self.board.to_string()))
+            elif squares:
+                player.send("squares: {0}".format("/".join(
+                    ["{0},{1},{2}".format(x, y, self.board.get(x, y)) for x, y in squares])))
+            player.send("score: {0}/{1}".format(sender.order, sender.score))
+            player.send("tile_pool: {0}".format(self.tiles.count))
+            player.send("current_player: {0}".format(self.current_player))
+
+    def end_game(self):
+        # after game, takes off the value of tiles left on racks and sends the winner
         winner, winning_score = None, 0
         for player in self.players:
             # removes value of remaining tiles from score
@@ -333,6 +1680,20 @@ class Host(threading.Thread):
                 player.send("score: {0}/{1}".format(i.order, i.score))
             player.send("winner: {0}".format(winner))
 
+    @classmethod
+    def replay(cls, seed, commands, player_count=2, lang="en", layout="standard"):
+        # plays a game again from its seed and commands, with PlayerClients in place of the players,
+        # and returns the Host at the end of it
+        players = [PlayerClient("player {0}".format(i + 1)) for i in range(player_count)]
+        host = cls(players[0], lang, layout, seed)
+        for player in players[1:]:
+            host.add_player(player)
+        host.set_up_game()
+        for order, command in commands:
+            host.handle_command(host.players[order], command)
+        host.end_game()
+        return host
+
     @staticmethod
     def find_words(board):
         words, roots = [], []
@@ -374,66 +1735,93 @@ class Host(threading.Thread):
         return words, roots
 
     def is_valid_move(self, board):
-        # gets the difference between the two boards
-        diff = [[" " for x in range(15)] for y in range(15)]
-        new_letters_at = []
-        for x in range(15):
-            for y in range(15):
-                if self.board[x][y] != board[x][y]:
-                    diff[x][y] = board[x][y]
-                    new_letters_at.append((x, y))
-        # validity check
-        xs, ys = list(set([i[0] for i in new_letters_at])), list(set([i[1] for i in new_letters_at]))
-        xs.sort()
-        ys.sort()
-        if len(xs) != 1 and len(ys) != 1:
+        # checks the new tiles on board are in one line with no gaps and touch an old tile or cover the centre
+        if not isinstance(board, Board):
+            board = Board(board)
+        new_letters_at = self.board.difference(board)  # (x, y)
+        xs, ys = set([i[0] for i in new_letters_at]), set([i[1] for i in new_letters_at])
+        # the new tiles as a bitmask along their line, and the tiles on that line after the move
+        if len(ys) == 1:
+            new, line = sum([1 << x for x in xs]), board.rows[new_letters_at[0][1]]
+        elif len(xs) == 1:
+            new, line = sum([1 << y for y in ys]), board.columns[new_letters_at[0][0]]
+        else:
             # if all new tiles don't fall on to the same line then false
             return False
-        # checks that new tiles are consecutive
-        elif len(xs) == 1:
-            counter = ys[0] + 1
-            while counter < ys[-1]:
-                if counter in ys or board[xs[0]][counter] != " ":
-                    counter += 1
-                else:
-                    return False
-        elif len(ys) == 1:
-            print(xs, ys)
-            counter = xs[0] + 1
-            while counter < xs[-1]:
-                if counter in xs or board[counter][ys[0]] != " ":
-                    counter += 1
-                else:
-                    return False
+        # checks that new tiles are consecutive, every square from the first to the last has to be filled
+        span = (1 << new.bit_length()) - (new & -new)
+        if (line | new) & span != span:
+            return False
         # if there is a tile on the center tile then legal always
         if (7, 7) in new_letters_at:
             if len(new_letters_at) > 1:
                 return True
         # checks new tiles touch at least one old tile
-        for tile in new_letters_at:
-            if tile[0] > 0 and self.board[tile[0] - 1][tile[1]] != " ":
-                return True
-            if tile[0] < 14 and self.board[tile[0] + 1][tile[1]] != " ":
-                return True
-            if tile[1] > 0 and self.board[tile[0]][tile[1] - 1] != " ":
-                return True
-            if tile[1] < 14 and self.board[tile[0]][tile[1] + 1] != " ":
+        return self.board.touches(new_letters_at)
+
+    def is_valid_placement(self, squares):
+        # checks new tiles on squares (x, y) go on empty squares of the host's board in one line with no gaps,
+        # and touch an old tile or cover the centre. only the placement's line is looked at
+        if len(squares) == 0 or len(set(squares)) != len(squares):
+            return False
+        for x, y in squares:
+            if not (0 <= x < 15 and 0 <= y < 15) or self.board.occupied(x, y):
+                return False
+        xs, ys = set([i[0] for i in squares]), set([i[1] for i in squares])
+        # the new tiles as a bitmask along their line, and the old tiles on that line
+        if len(ys) == 1:
+            new, line = sum([1 << x for x in xs]), self.board.rows[squares[0][1]]
+        elif len(xs) == 1:
+            new, line = sum([1 << y for y in ys]), self.board.columns[squares[0][0]]
+        else:
+            return False
+        # every square from the first new tile to the last has to be filled
+        span = (1 << new.bit_length()) - (new & -new)
+        if (line | new) & span != span:
+            return False
+        if (7, 7) in squares:
+            if len(squares) > 1:
                 return True
-        return False
+        return self.board.touches(squares)
+
+    def find_illegal_placement_words(self, squares, letters):
+        # returns the words made by placing letters on squares (x, y) that aren't in the dictionary,
+        # the word along the new tiles first and then the ones crossing each tile
+        new_tiles = dict(zip(squares, letters))
+        horizontal = len(squares) == 1 or squares[0][1] == squares[-1][1]
+        direction = (1, 0) if horizontal else (0, 1)
+        words = [self.line_word(new_tiles, squares[0], direction)]
+        words += [self.line_word(new_tiles, square, (direction[1], direction[0])) for square in squares]
+        # blanks are lower case, so each word is one walk of the dictionary
+        return [word for word in words if word != "" and not self.words.contains(word.upper())]
+
+    def line_word(self, new_tiles, square, direction):
+        # returns the word through square along direction once new_tiles {(x, y): letter} are on the host's board,
+        # or "" if it is a single letter
+        x, y = square
+        dx, dy = direction
+        while x - dx >= 0 and y - dy >= 0 and (self.board.occupied(x - dx, y - dy) or (x - dx, y - dy) in new_tiles):
+            x, y = x - dx, y - dy
+        word = ""
+        while x < 15 and y < 15:
+            if (x, y) in new_tiles:
+                word += new_tiles[(x, y)]
+            elif self.board.occupied(x, y):
+                word += self.board.get(x, y)
+            else:
+                break
+            x, y = x + dx, y + dy
+        return word if len(word) > 1 else ""
 
     def calculate_score(self, board, rack):
         words, roots = self.find_words(board)
         old_words, old_roots = self.find_words(self.board)
+        old_words = set(zip(old_words, old_roots))
         new_words, new_roots = [], []
         for word, root in zip(words, roots):
-            if word not in old_words:
+            if (word, root) not in old_words:
                 new_words.append(word)
                 new_roots.append(root)
-            else:
-                index = old_words.index(word)
-                if old_roots[index] != root:
-                    new_words.append(word)
-                    new_roots.append(root)
         value = 0
         # gets the score of each word modified
         for word, root in zip(new_words, new_roots):
@@ -446,54 +1834,212 @@ class Host(threading.Thread):
                     tile = (root[0], root[1] + i)
                 else:
                     tile = (root[0] + i, root[1])
-                # applies any bonuses the tile may have
-                if self.board[tile[1]][tile[0]] == " ":
-                    if tile in self.bonus_tiles["DW"]:
-                        multiplier *= 2
-                    elif tile in self.bonus_tiles["TW"]:
-                        multiplier *= 3
-                    elif tile in self.bonus_tiles["DL"]:
-                        bonus_letters += word[i]
-                    elif tile in self.bonus_tiles["TL"]:
-                        bonus_letters += word[i] * 2
+                # applies any bonuses the tile may have, tile is (row, column)
+                if self.board[tile[0]][tile[1]] == " ":
+                    index = tile[0] * 15 + tile[1]
+                    multiplier *= self.layout.word_multipliers[index]
+                    bonus_letters += word[i] * (self.layout.letter_multipliers[index] - 1)
             value += self.tiles.get_value(word + bonus_letters) * multiplier
-            # 50 point bonus for using 7 tiles
-            new_tiles = 0
-            for i in range(15):
-                for j in range(15):
-                    if self.board[i][j] == " " and board[i][j] != " ":
-                        new_tiles += 1
-            if new_tiles == 7:
-                value += 50
+        # 50 point bonus for using 7 tiles
+        new_tiles = 0
+        for i in range(15):
+            for j in range(15):
+                if self.board[i][j] == " " and board[i][j] != " ":
+                    new_tiles += 1
+        if new_tiles == 7:
+            value += 50
         return value
 
-    def set_board(self, board):
-        has_blanks = True if True in [True if "*" in i else False for i in board] else False
-        if has_blanks:
-            words, roots = self.find_words(board)
-            for word, root in zip(words, roots):
-                if "*" in word:
-                    new_word = random.choice(self.words.find(word))
-                    tile = list(root)
-                    for old_letter, new_letter in zip(word, new_word):
-                        if old_letter != new_letter:
-                            print(tile, new_letter, board)
-                            board[tile[0]][tile[1]] = new_letter
-                            print(board)
-                        if tile[2]:
-                            tile[1] += 1
-                        else:
-                            tile[0] += 1
+    def score_placement(self, squares, letters, board=None):
+        # scores new tiles placed on squares (x, y) of board, the host's board by default
+        return self.scorer.score_placement(squares, letters, self.board if board is None else board)
 
+    def set_board(self, board):
+        # blanks on board are already the lower case letter the player chose for them
+        if not isinstance(board, Board):
+            board = Board(board)
         self.board = board
 
     def find_illegal_words(self, board):
-        illegal_words = []
         words, roots = self.find_words(board)
-        for word in words:
-            if len(self.words.find(word)) == 0:
-                illegal_words.append(word)
-        return illegal_words
+        return [word for word in words if not self.words.contains(word.upper())]
+
+
+FRAME_HEADER = "<H"  # length of the fields after it
+# opcodes are sent as their index in this list, the kind says how the value is packed.
+# anything not in it goes as "other", with the opcode's name as text
+MESSAGE_OPCODES = [("other", "other"), ("order", "int"), ("order_tile", "text"), ("player_count", "int"),
+                   ("tiles", "text"), ("current_player", "int"), ("tile_pool", "int"), ("score", "score"),
+                   ("board", "board"), ("squares", "squares"), ("winner", "text"), ("error1", "text"),
+                   ("error2", "text"), ("place", "place"), ("move", "move"), ("pass", "text"),
+                   ("swap", "text"), ("protocol", "text"), ("codec", "text"), ("error3", "text")]
+
+
+class MessageCodec:
+    """turns the messages between players and the host into binary frames and back.
+    a message is a list of [opcode, value] fields, as text it's "opcode: operand; opcode: operand".
+    a frame is a uint16 length and then each field as an opcode byte and its value:
+    int is an int32, text is a uint16 length and utf-8, score is the player byte and an int32,
+    board is the 225 letters, squares is a count byte and x, y, letter bytes for each square,
+    move is x, y and direction bytes then the letters as text, place is the board then the rack as text"""
+
+    def __init__(self):
+        self.codes = dict([(opcode, code) for (opcode, kind), code in
+                           zip(MESSAGE_OPCODES, range(len(MESSAGE_OPCODES)))])
+        self.header = struct.Struct(FRAME_HEADER)
+        self.int = struct.Struct("<i")
+        self.length = struct.Struct("<H")
+        self.score = struct.Struct("<Bi")
+
+    def parse(self, command):
+        # returns the fields of a text message, raises ValueError if it's not in the right form
+        fields = []
+        for field in command.split("; "):
+            opcode, operand = field.split(": ", 1)
+            kind = MESSAGE_OPCODES[self.codes.get(opcode, 0)][1]
+            if kind == "int":
+                value = int(operand)
+            elif kind == "score":
+                player, score = operand.split("/")
+                value = (int(player), int(score))
+            elif kind == "squares":
+                value = []
+                for square in operand.split("/") if operand != "" else []:
+                    x, y, letter = square.split(",")
+                    value.append((int(x), int(y), letter))
+            elif kind == "move":
+                x, y, direction, letters = operand.split(",")
+                value = (int(x), int(y), direction, letters)
+            elif kind == "place":
+                board, rack = operand.split("/")
+                value = (board, rack)
+            else:
+                value = operand
+            fields.append([opcode, value])
+        return fields
+
+    def format(self, fields):
+        # returns the text message of fields
+        operands = []
+        for opcode, value in fields:
+            kind = MESSAGE_OPCODES[self.codes.get(opcode, 0)][1]
+            if kind == "score":
+                operand = "{0}/{1}".format(*value)
+            elif kind == "squares":
+                operand = "/".join(["{0},{1},{2}".format(*square) for square in value])
+            elif kind == "move":
+                operand = "{0},{1},{2},{3}".format(*value)
+            elif kind == "place":
+                operand = "{0}/{1}".format(*value)
+            else:
+                operand = str(value)
+            operands.append("{0}: {1}".format(opcode, operand))
+        return "; ".join(operands)
+
+    def encode(self, fields):
+        # returns the frame of fields, raises ValueError if a value doesn't fit its kind
+        body = bytearray()
+        try:
+            for opcode, value in fields:
+                code = self.codes.get(opcode, 0)
+                kind = MESSAGE_OPCODES[code][1]
+                body.append(code)
+                if kind == "other":
+                    self.pack_text(body, opcode)
+                    self.pack_text(body, value)
+                elif kind == "int":
+                    body += self.int.pack(value)
+                elif kind == "text":
+                    self.pack_text(body, value)
+                elif kind == "score":
+                    body += self.score.pack(*value)
+                elif kind == "board":
+                    if len(value) != 225:
+                        raise ValueError("a board has 225 squares, not {0}".format(len(value)))
+                    body += value.encode("ascii")
+                elif kind == "squares":
+                    body.append(len(value))
+                    for x, y, letter in value:
+                        body += bytes((x, y, ord(letter)))
+                elif kind == "move":
+                    x, y, direction, letters = value
+                    body += bytes((x, y, ord(direction)))
+                    self.pack_text(body, letters)
+                elif kind == "place":
+                    board, rack = value
+                    if len(board) != 225:
+                        raise ValueError("a board has 225 squares, not {0}".format(len(board)))
+                    body += board.encode("ascii")
+                    self.pack_text(body, rack)
+            return self.header.pack(len(body)) + body
+        except (struct.error, TypeError, UnicodeEncodeError) as error:
+            raise ValueError("can't encode {0}: {1}".format(fields, error))
+
+    def pack_text(self, body, text):
+        text = text.encode()
+        body += self.length.pack(len(text))
+        body += text
+
+    def decode(self, frame):
+        # returns the fields of a frame, raises ValueError if it's cut short or has an unknown opcode
+        try:
+            length, = self.header.unpack_from(frame)
+            if length != len(frame) - self.header.size:
+                raise ValueError("frame should have {0} bytes after its header, not {1}".format(
+                    length, len(frame) - self.header.size))
+            fields = []
+            i = self.header.size
+            while i < len(frame):
+                opcode, kind = MESSAGE_OPCODES[frame[i]]
+                i += 1
+                if kind == "other":
+                    opcode, i = self.unpack_text(frame, i)
+                    value, i = self.unpack_text(frame, i)
+                elif kind == "int":
+                    value, = self.int.unpack_from(frame, i)
+                    i += self.int.size
+                elif kind == "text":
+                    value, i = self.unpack_text(frame, i)
+                elif kind == "score":
+                    value = self.score.unpack_from(frame, i)
+                    i += self.score.size
+                elif kind == "board":
+                    value = frame[i:i + 225].decode("ascii")
+                    i += 225
+                elif kind == "squares":
+                    end = i + 1 + frame[i] * 3
+                    value = [(frame[j], frame[j + 1], chr(frame[j + 2])) for j in range(i + 1, end, 3)]
+                    i = end
+                elif kind == "move":
+                    x, y, direction = frame[i], frame[i + 1], chr(frame[i + 2])
+                    letters, i = self.unpack_text(frame, i + 3)
+                    value = (x, y, direction, letters)
+                elif kind == "place":
+                    board = frame[i:i + 225].decode("ascii")
+                    rack, i = self.unpack_text(frame, i + 225)
+                    value = (board, rack)
+                fields.append([opcode, value])
+        except (struct.error, IndexError, UnicodeDecodeError) as error:
+            raise ValueError("bad frame: {0}".format(error))
+        if i != len(frame):
+            raise ValueError("bad frame: the last field runs past the end")
+        return fields
+
+    def unpack_text(self, frame, i):
+        # returns the text at i and where it ends
+        length, = self.length.unpack_from(frame, i)
+        i += self.length.size
+        if i + length > len(frame):
+            raise IndexError("text runs past the end of the frame")
+        return frame[i:i + length].decode(), i + length
+
+    def frame_length(self, header):
+        # returns how many bytes follow a frame's header
+        return self.header.unpack(header)[0]
+
+
+# there's nothing in a codec that changes, so every connection shares this one
+message_codec = MessageCodec()
 
 
 class PlayerHost:
@@ -504,14 +2050,25 @@ class PlayerHost:
         self.tiles = []
         self.order = None
         self.score = 0
+        self.delta = False  # if the player gets the squares that changed instead of the whole board
+        self.binary = False  # if the player gets frames from message_codec instead of text
 
     def send(self, command):
         # update to actual code
+        if self.binary:
+            command = message_codec.encode(message_codec.parse(command))
         self.player.receive(command)
 
     def receive(self, string):
-        self.host.inputs.append([self, string])
-        print("server received: {0}".format(string))
+        # string is a text message or a frame, the host is only given text
+        if isinstance(string, bytes):
+            string = message_codec.format(message_codec.decode(string))
+        if string[:7] == "codec: ":
+            # "codec: binary" or "codec: text", it's about this connection so the host never sees it
+            self.binary = string[7:] == "binary"
+            return
+        self.host.inputs.put_nowait([self, string])
+        self.host.log.write("debug", "received", player=self.order, command=string)
 
 
 class PlayerClient:
@@ -529,48 +2086,93 @@ class PlayerClient:
         self.host = None
         self.update = update
         self.name = name
+        self.delta = False  # asks the host for deltas and sends moves as them if True
+        self.binary = False  # sends frames from message_codec instead of text, see use_binary
 
     def receive(self, command):
-        # update to actual code
-        updated = []
-        try:
-            commands = command.split("; ")
-            for command in commands:
-                opcode, operand = command.split(": ")
-                if opcode == "order":
-                    self.order = int(operand)
-                elif opcode == "order_tile":
-                    pass
-                elif opcode == "tiles":
-                    self.tiles = list(operand)
-                elif opcode == "score":
-                    player, score = operand.split("/")
-                    player, score = int(player), int(score)
-                    self.scores[player] = score
-                    print("scores now {0}".format(self.scores))
-                elif opcode == "board":
-                    self.board = [[operand[j * 15 + i] for i in range(15)] for j in range(15)]
-                elif opcode == "player_count":
-                    self.player_count = int(operand)
-                elif opcode == "current_player":
-                    self.current_player = int(operand)
-                elif opcode == "tile_pool":
-                    self.tile_pool = int(operand)
-                updated.append([opcode, operand])
-        except:
-            raise
+        # command is a text message or a frame, update is called with its [opcode, value] fields
+        if isinstance(command, bytes):
+            updated = message_codec.decode(command)
+        else:
+            updated = message_codec.parse(command)
+        for opcode, value in updated:
+            if opcode == "order":
+                self.order = value
+            elif opcode == "order_tile":
+                pass
+            elif opcode == "tiles":
+                self.tiles = list(value)
+            elif opcode == "score":
+                player, score = value
+                self.scores[player] = score
+                game_log.write("debug", "scores", player=self.order, scores=list(self.scores))
+            elif opcode == "board":
+                self.board = [[value[j * 15 + i] for i in range(15)] for j in range(15)]
+            elif opcode == "squares":
+                if self.board is None:
+                    self.board = [[" " for i in range(15)] for j in range(15)]
+                for x, y, letter in value:
+                    self.board[y][x] = letter
+            elif opcode == "player_count":
+                self.player_count = value
+            elif opcode == "current_player":
+                self.current_player = value
+            elif opcode == "tile_pool":
+                self.tile_pool = value
         if self.update is not None:
             self.update(updated)
 
     def send(self, string):
         # update to actual code
+        if self.binary:
+            string = message_codec.encode(message_codec.parse(string))
         self.host.receive(string)
 
+    def use_binary(self):
+        # asks the host for frames instead of text, this is the last message sent as text
+        self.send("codec: binary")
+        self.binary = True
+
+    def send_placement(self, board, rack):
+        # sends the move that makes board, as "move: x,y,h or v,letters" if using deltas
+        # or else as the whole board and what's left of the rack
+        board = board if isinstance(board, Board) else Board(board)
+        squares = Board(self.board).difference(board) if self.delta else []
+        if len(squares) > 0:
+            direction = "v" if len(squares) > 1 and squares[0][0] == squares[1][0] else "h"
+            self.send("move: {0},{1},{2},{3}".format(squares[0][0], squares[0][1], direction,
+                                                      "".join([board.get(x, y) for x, y in squares])))
+        else:
+            self.send("place: {0}/{1}".format(board.to_string(), "".join(rack)))
+
+
+class TurnStats:
+    """timings and counters for one turn of a BotV1. phases are the seconds spent in each part of find_move
+    and counters count the work done in them, both are dicts so move generators can add their own"""
+
+    def __init__(self, turn):
+        self.turn = turn
+        self.total = 0.0
+        self.phases = {}
+        self.counters = {}
+        self.profile = None  # pstats.Stats for the turn, if the bot's profile is on
+
+    def add_time(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def count(self, counter, amount=1):
+        self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def as_dict(self):
+        return {"turn": self.turn, "total": self.total, "phases": dict(self.phases), "counters": dict(self.counters)}
+
 
 class BotV1(PlayerClient):
     """This is the first BOt based on a paper by Andrew W. Appel AND Guy J. Jacobson in May 1988
-    it uses a DAWG structure in it's methodology and finds The highest value next move"""
-    def __init__(self, dictionary=None, update=None):
+    it uses a DAWG structure in it's methodology and finds The highest value next move.
+    the words are found by generator, DAWGMoveGenerator by default or GADDAGMoveGenerator,
+    or by a ParallelMoveSearch if search is given"""
+    def __init__(self, dictionary=None, update=None, generator=None, search=None, anagrams=None):
         super().__init__(self, "Bot")
         self.host_main = None
         self.update = self.do_turn
@@ -579,20 +2181,24 @@ class BotV1(PlayerClient):
         self.letters = [chr(i) for i in range(ord("A"), ord("Z") + 1)]
         self.board = [[" " for x in range(15)] for y in range(15)]
         self.potential_anchors = set([])
+        self.checked_board = None  # the board the anchors and cross checks were worked out for
+        self.debug_cross_checks = False  # checks the kept cross checks against a full recompute every turn
         self.moves = 0
-        self.file_name = None
+        self.delta = True  # moves are sent as placements and the host only sends the squares that change
+        self.game = None  # the time the game started, used to tell games apart in the log
+        self.log = game_log  # or None for no log
+        self.on_turn_stats = None  # called with the TurnStats of each turn
+        self.last_stats = None
+        self.profile = False  # runs cProfile over each turn, the results go in TurnStats.profile
         # creates new english dictionary if none is passed in
         if dictionary is None:
-            lang = "en"
-            if os.path.exists("Dictionaries/" + lang + ".txt"):
-                file = open("Dictionaries/" + lang + ".txt", "r")
-                words = file.readlines()
-                file.close()
-            for i in range(len(words)):
-                words[i] = words[i].replace("\n", "")
-            self.DAWG = DAWG(words)
+            self.DAWG = dictionaries.get("en")
         else:
             self.DAWG = dictionary
+        self.generator = DAWGMoveGenerator(self.DAWG) if generator is None else generator
+        self.search = search
+        # an AnagramIndex of the bot's word list, if given the rack's bingos give the search a score to beat
+        self.anagrams = anagrams
 
     def do_turn(self, types):
         passthrough = types
@@ -600,193 +2206,199 @@ class BotV1(PlayerClient):
         if "current_player" in types and self.current_player == self.order:
             move, board, rack = self.find_move()
             if move:
-                board = "".join(["".join(i) for i in board])  # converts board into a string of all the letters
-                rack = "".join(rack)
-                self.send("place: {0}/{1}".format(board, rack))
+                self.send_placement(board, rack)
             else:
                 if self.tile_pool > 0:
                     rack = "".join(self.tiles[:min(len(self.tiles), self.tile_pool) - 1])
                     self.send("swap: {0}".format(rack))
                 else:
                     self.send("pass: ")
-        # sets log file name when game begins
-        if "order" in types and self.file_name is None:
-            self.file_name = "logs/{0}-{1}.txt".format(datetime.datetime.now().strftime("%d-%m-%Y-%H-%M-%S"), self.order)
+        # names the game in the log when it begins
+        if "order" in types and self.game is None:
+            self.game = datetime.datetime.now().strftime("%d-%m-%Y-%H-%M-%S")
+        if "order" in types and self.delta:
+            self.send("protocol: delta")
         if self.secondary_update is not None:
             self.secondary_update(passthrough)
 
-    def do_cross_checks(self):
-        # compute cross checks (change so it only computes places with changes)
+    def do_cross_checks(self, stats=None):
+        # the anchors and cross checks are kept between turns, only the rows and columns
+        # with squares that have changed since they were last worked out are done again
         if self.board is not None:
-            # find anchors
-            self.potential_anchors = set([])
+            board = Board(self.board)
+            misses = 0
+            if self.checked_board is None:
+                rows, columns = set(range(15)), set(range(15))
+            else:
+                rows, columns = set([]), set([])
+                for x, y in self.checked_board.difference(board):
+                    rows.add(y)
+                    columns.add(x)
+            # a square's cross check only depends on its own row and column
             for i in range(15):
+                anchors = board.anchor_mask(i)
                 for j in range(15):
-                    if self.board[i][j] == " ":
-                        if i > 0 and self.board[i - 1][j] != " ":
-                            self.potential_anchors.add((j, i))
-                        elif i < 14 and self.board[i + 1][j] != " ":
+                    if i in rows or j in columns:
+                        self.potential_anchors.discard((j, i))
+                        self.cross_checks.pop((j, i), None)
+                        if anchors >> j & 1:
                             self.potential_anchors.add((j, i))
-                        elif j > 0 and self.board[i][j - 1] != " ":
-                            self.potential_anchors.add((j, i))
-                        elif j < 14 and self.board[i][j + 1] != " ":
-                            self.potential_anchors.add((j, i))
-            # does cross checks (cross checks only need to happen on potential anchors)
-            self.cross_checks = {}
-            for i in self.potential_anchors:
-                # gets column and row of anchor
-                line_x = list(self.board[i[1]])
-                line_x[i[0]] = "*"
-                line_y = [line[i[0]] for line in self.board]
-                line_y[i[1]] = "*"
-                # removes spaces that don't connect to anchor
-                x = i[0] - 1
-                while x >= 0:
-                    if line_x[x] == " ":
-                        line_x = line_x[x + 1:]
-                        x = -1
-                    else:
-                        x -= 1
-                x = 1
-                while x < len(line_x):
-                    if line_x[x] == " ":
-                        line_x = line_x[:x]
-                        x = 15
-                    else:
-                        x += 1
-                y = i[1] - 1
-                while y >= 0:
-                    if line_y[y] == " ":
-                        line_y = line_y[y + 1:]
-                        y = -1
-                    else:
-                        y -= 1
-                y = 1
-                while y < len(line_y):
-                    if line_y[y] == " ":
-                        line_y = line_y[:y]
-                        y = 15
-                    else:
-                        y += 1
-                # converts list into string with all upper case
-                line_x, line_y = "".join(line_x).upper(), "".join(line_y).upper()
-                # finds the letters that the anchor could be based on the row
-                if line_x != "*":
-                    index = line_x.index("*")
-                    words = self.DAWG.find(line_x)
-                    letters = [word[index].upper() for word in words]
-                    self.cross_checks[i] = set(letters)
-                # finds the letters teh anchor could be based on the column and does the intersection with found letters
-                if line_y != "*":
-                    index = line_y.index("*")
-                    words = self.DAWG.find(line_y)
-                    letters = [word[index].upper() for word in words]
-                    if i in self.cross_checks.keys():
-                        self.cross_checks[i] = self.cross_checks[i].intersection(letters)
-                    else:
-                        self.cross_checks[i] = set(letters)
+                            self.cross_checks[(j, i)] = self.find_cross_check((j, i))
+                            misses += 1
+            self.checked_board = board
+            if stats is not None:
+                stats.count("cross_check_hits", len(self.cross_checks) - misses)
+                stats.count("cross_check_misses", misses)
+            if self.debug_cross_checks:
+                self.check_cross_checks()
 
-    def find_move(self):
-        t0 = time.time()
-        self.do_cross_checks()
+    def check_cross_checks(self):
+        # debug check that the kept anchors and cross checks are the same as working them all out again
+        anchors, cross_checks = set([]), {}
+        for i in range(15):
+            for j in range(15):
+                if self.is_anchor(j, i):
+                    anchors.add((j, i))
+                    cross_checks[(j, i)] = self.find_cross_check((j, i))
+        if anchors != self.potential_anchors or cross_checks != self.cross_checks:
+            wrong = [i for i in anchors | self.potential_anchors if cross_checks.get(i) != self.cross_checks.get(i)]
+            raise RuntimeError("kept cross checks differ from a full recompute at {0}".format(sorted(wrong)))
+
+    def is_anchor(self, x, y):
+        # anchors are empty squares next to a tile, worked out from the lists so it can check Board.is_anchor
+        if self.board[y][x] != " ":
+            return False
+        return (y > 0 and self.board[y - 1][x] != " ") or (y < 14 and self.board[y + 1][x] != " ") or \
+            (x > 0 and self.board[y][x - 1] != " ") or (x < 14 and self.board[y][x + 1] != " ")
+
+    def find_cross_check(self, i):
+        # returns the set of letters that can go on anchor i given the tiles in its row and column
+        cross_check = None
+        # gets column and row of anchor
+        line_x = list(self.board[i[1]])
+        line_x[i[0]] = "*"
+        line_y = [line[i[0]] for line in self.board]
+        line_y[i[1]] = "*"
+        # removes spaces that don't connect to anchor
+        x = i[0] - 1
+        while x >= 0:
+            if line_x[x] == " ":
+                line_x = line_x[x + 1:]
+                x = -1
+            else:
+                x -= 1
+        x = 1
+        while x < len(line_x):
+            if line_x[x] == " ":
+                line_x = line_x[:x]
+                x = 15
+            else:
+                x += 1
+        y = i[1] - 1
+        while y >= 0:
+            if line_y[y] == " ":
+                line_y = line_y[y + 1:]
+                y = -1
+            else:
+                y -= 1
+        y = 1
+        while y < len(line_y):
+            if line_y[y] == " ":
+                line_y = line_y[:y]
+                y = 15
+            else:
+                y += 1
+        # converts list into string with all upper case
+        line_x, line_y = "".join(line_x).upper(), "".join(line_y).upper()
+        # finds the letters that the anchor could be based on the row
+        if line_x != "*":
+            index = line_x.index("*")
+            words = self.DAWG.find(line_x)
+            letters = [word[index].upper() for word in words]
+            cross_check = set(letters)
+        # finds the letters teh anchor could be based on the column and does the intersection with found letters
+        if line_y != "*":
+            index = line_y.index("*")
+            words = self.DAWG.find(line_y)
+            letters = [word[index].upper() for word in words]
+            if cross_check is not None:
+                cross_check = cross_check.intersection(letters)
+            else:
+                cross_check = set(letters)
+        return cross_check
+
+    def find_lines(self, stats=None):
+        # returns the rows and columns of the board, in turn, with anchors as sets of their possible letters
+        t0 = time.perf_counter()
+        self.do_cross_checks(stats)
+        t1 = time.perf_counter()
+        cross_checks = self.cross_checks
         if len(self.potential_anchors) == 0:
             # if there are no potential anchors (the board is empty), then set the centre square as the only anchor
-            self.potential_anchors.add((7, 7))
-            self.cross_checks[(7, 7)] = set([chr(i) for i in range(ord("A"), ord("Z") + 1)])
-            # self.cross_checks[(5, 7)] = set([chr(i) for i in range(ord("A"), ord("Z") + 1)])
+            # this isn't kept with the other cross checks as it stops being an anchor once there are tiles
+            cross_checks = {(7, 7): set([chr(i) for i in range(ord("A"), ord("Z") + 1)])}
 
         lines = []
         for i in range(15):
             # gets each line on the board and adds anchors as sets of their possible letters
             horizontal = list(self.board[i])
             vertical = [j[i] for j in self.board]
-            for anchor in self.cross_checks.keys():
+            for anchor in cross_checks.keys():
                 if anchor[0] == i:
-                    vertical[anchor[1]] = self.cross_checks[anchor]
+                    vertical[anchor[1]] = cross_checks[anchor]
                 if anchor[1] == i:
-                    horizontal[anchor[0]] = self.cross_checks[anchor]
+                    horizontal[anchor[0]] = cross_checks[anchor]
             lines += [horizontal, vertical]
+        if stats is not None:
+            stats.add_time("cross_checks", t1 - t0)
+            stats.add_time("line_splitting", time.perf_counter() - t1)
+            stats.count("anchors", len(cross_checks))
+        return lines
 
-        split_words = []  # each word is a tuple where (left_side, right_side, leftmost_anchor, horizontal?)
-
-        for line, index in zip(lines, range(len(lines))):
-            # gets the left part and right part
-            counter = 0  # counter keeps the index in term of the modified line
-            counter_2 = 0  # counter 2 keeps track of line in relation to the original list
-            while counter < len(line):
-                if isinstance(line[counter], set):
-                    # if current place is an anchor add a new word
-                    left_side = line[:counter]
-                    right_side = line[counter:]
-                    line = line[counter+1:]
-                    # finds the anchor for this word
-                    if index % 2 == 0:
-                        anchor = (counter_2, index // 2)
-                    else:
-                        anchor = (index // 2, counter_2)
-                    counter = 0
-                    counter_2 += 1
-                    split_words.append([left_side, right_side, anchor, index % 2 == 0])
-
-                else:
-                    counter += 1
-                    counter_2 += 1
-
-        words = []  # (word, root, horizontal?)
-        for left_side, right_side, anchor, horizontal in split_words:
-            if len(left_side) == 0:
-                # if left_side is empty
-                new_words = self.DAWG.find_right_side(right_side, list(self.tiles))
-                words += [(word, anchor, horizontal) for word in new_words]
-            elif left_side[-1] == " ":
-                # if left_side is all blank
-                left_sides = self.DAWG.find_left_side(list(self.tiles), len(left_side))
-                for left in left_sides:
-                    if horizontal:
-                        root = (anchor[0] - len(left), anchor[1])
-                    else:
-                        root = (anchor[0], anchor[1] - len(left))
-                    new_words = self.DAWG.find_right_side(list(left) + right_side, list(self.tiles))
-                    words += [(word, root, horizontal) for word in new_words]
-            else:
-                # if left_side is all tiles
-                if horizontal:
-                    root = (anchor[0] - len(left_side), anchor[1])
-                else:
-                    root = (anchor[0], anchor[1] - len(left_side))
-                new_rack = list(self.tiles) + ["*" if i.islower() else i for i in left_side]
-                new_words = self.DAWG.find_right_side(left_side + right_side, new_rack)
-                words += [(word, root, horizontal) for word in new_words]
-
-        # exception for when no words are found
-        if len(words) == 0:
-            return False, None, None
-
-        # gets scores
+    @staticmethod
+    def score_words(words, board, scorer):
+        # turns each (word, root, horizontal?) into (word, root, horizontal?, score) using scorer.score_placement,
+        # only the letters that go on empty squares are new tiles
         for word, index in zip(words, range(len(words))):
-            new_board = [list(line) for line in self.board]
-            new_rack = list(self.tiles)
+            squares, letters = [], []
             current_square = list(word[1])
             for letter in word[0]:
-                new_board[current_square[1]][current_square[0]] = letter
+                if board[current_square[1]][current_square[0]] == " ":
+                    squares.append(tuple(current_square))
+                    letters.append(letter)
                 if word[2]:
                     current_square[0] += 1
                 else:
                     current_square[1] += 1
-            score = self.host_main.calculate_score(new_board, new_rack)
+            score = scorer.score_placement(squares, letters, board)
             words[index] = (word[0], word[1], word[2], score)
+        return words
+
+    def find_move(self):
+        t0 = time.time()
+        stats = TurnStats(self.moves + 1)
+        profiler = cProfile.Profile() if self.profile else None
+        if profiler is not None:
+            profiler.enable()
+        lines = self.find_lines(stats)
+        words = self.best_moves(1, lines, stats)
+        t1 = time.perf_counter()
+
+        # exception for when no words are found
+        if len(words) == 0:
+            self.finish_stats(stats, t0, profiler)
+            return False, None, None
 
         # word selection (chooses the highest scoring word)
-        words.sort(key=lambda x: x[3], reverse=True)
         chosen_word = words[0]
 
         # places chosen word on the board
-        new_board = [list(line) for line in self.board]
+        new_board = Board(self.board)
         new_rack = list(self.tiles)
         current_square = list(chosen_word[1])
         for letter in chosen_word[0]:
-            new_board[current_square[1]][current_square[0]] = letter
             if self.board[current_square[1]][current_square[0]] == " ":
+                new_board.set(current_square[0], current_square[1], letter)
                 if letter.isupper():
                     new_rack.pop(new_rack.index(letter))
                 else:
@@ -795,24 +2407,186 @@ class BotV1(PlayerClient):
                 current_square[0] += 1
             else:
                 current_square[1] += 1
+        stats.add_time("selection", time.perf_counter() - t1)
+        self.finish_stats(stats, t0, profiler)
 
-        t1 = time.time()
-        # logging code
-        if self.file_name is not None:
-            log_file = open(self.file_name, "a")
-            log_file.write("------------/ Move {0} \--------------\n".format(self.moves + 1))
-            log_file.write("chosen move: {0}\nscore: {1}\n".format(chosen_word[0], chosen_word[3]))
-            log_file.write("time taken: {0}s\n".format(t1-t0))
-            log_file.write("".join(["".join(i) + "\n" for i in new_board]))
-            log_file.close()
+        # logging code, the record is written by the log's own thread
+        if self.log is not None and self.log.enabled("info"):
+            record = stats.as_dict()
+            if self.log.enabled("debug"):
+                record["board"] = new_board.to_string()
+            self.log.write("info", "move", game=self.game, player=self.order, word=chosen_word[0],
+                           root=chosen_word[1], horizontal=chosen_word[2], score=chosen_word[3], **record)
 
         self.moves += 1
 
         return True, new_board, new_rack
 
+    def best_moves(self, k=1, lines=None, stats=None):
+        # returns the k best (word, root, horizontal?, score) for the rack, best first. moves with the same score
+        # are in the order the search finds them, so the first is the move find_move plays
+        lines = self.find_lines(stats) if lines is None else lines
+        if self.search is not None:
+            # already scored and sorted, each process sends back its k best moves
+            t0 = time.perf_counter()
+            words = self.search.find_moves(lines, self.tiles, self.board, k)
+            if stats is not None:
+                stats.add_time("parallel_search", time.perf_counter() - t0)
+            return words
+        top = TopMoves(k)
+        scorer = self.host_main.scorer
+        if self.anagrams is not None:
+            # the generator finds the bingos again in their own place, so they only give the search a score
+            # to beat from the start and moves with the same score keep the generator's order
+            bingos = self.score_words(self.find_bingos(lines, stats), self.board, scorer)
+            top.expect([move[3] for move in bingos])
+        for order, move in self.generator.iter_moves(lines, self.tiles, self.board, scorer, top, stats=stats):
+            top.add(order, move)
+        return top.moves()
+
+    def find_bingos(self, lines, stats=None):
+        # returns the (word, root, horizontal?) placements of the 7 letter words that use the whole rack on
+        # empty squares. the words come from the anagram index and each is only tried on the runs of 7 squares
+        # in lines with an anchor, which is much less work than a search
+        if len(self.tiles) != 7:
+            return []
+        t0 = time.perf_counter()
+        words = [word for word, blanks in self.anagrams.bingos(self.tiles)]
+        placements = []
+        for word in words:
+            for line, index in zip(lines, range(len(lines))):
+                for start in range(len(line) - len(word) + 1):
+                    letters = self.fit_bingo(word, self.tiles, line, start)
+                    if letters is not None:
+                        root = (start, index // 2) if index % 2 == 0 else (index // 2, start)
+                        placements.append((letters, root, index % 2 == 0))
+        if stats is not None:
+            stats.add_time("bingos", time.perf_counter() - t0)
+            stats.count("bingo_words", len(words))
+            stats.count("bingo_placements", len(placements))
+        return placements
+
+    @staticmethod
+    def fit_bingo(word, rack, line, start):
+        # returns word as it would be put on line from start with the tiles in rack, blanks in lower case, or None
+        # if it can't go there. every square has to be empty and the ones either side too, with an anchor that
+        # allows its letter. it has to be a move the move generators find, and they don't start a word on its
+        # first anchor if the square before that is empty
+        end = start + len(word)
+        for square in [line[start - 1] if start > 0 else " ", line[end] if end < len(line) else " "]:
+            if not isinstance(square, set) and square != " ":
+                return None
+        if isinstance(line[start], set) and start > 0 and line[start - 1] == " ":
+            return None
+        rack = list(rack)
+        letters, anchored = [], False
+        for letter, square in zip(word, line[start:end]):
+            if isinstance(square, set):
+                if letter not in square:
+                    return None
+                anchored = True
+            elif square != " ":
+                return None
+            # a blank is only used for a letter that isn't on the rack
+            if letter in rack:
+                rack.remove(letter)
+            elif "*" in rack:
+                rack.remove("*")
+                letter = letter.lower()
+            else:
+                return None
+            letters.append(letter)
+        return "".join(letters) if anchored and len(rack) == 0 else None
+
+    def finish_stats(self, stats, t0, profiler=None):
+        # keeps the stats of the turn and passes them to on_turn_stats
+        if profiler is not None:
+            profiler.disable()
+            stats.profile = pstats.Stats(profiler)
+        stats.total = time.time() - t0
+        self.last_stats = stats
+        if self.on_turn_stats is not None:
+            self.on_turn_stats(stats)
+
+
+class SearchWorker:
+    """the state each process of a ParallelMoveSearch keeps between turns, moves are scored the same way
+    as the Host scores them"""
+
+    def __init__(self, lang="en", structure=None, layout="standard"):
+        structure = DAWG if structure is None else structure
+        # compiled dictionaries are mmapped, so the processes all read the same pages
+        dictionary = dictionaries.get(lang, structure)
+        if structure is GADDAG:
+            self.generator = GADDAGMoveGenerator(dictionary)
+        else:
+            self.generator = DAWGMoveGenerator(dictionary)
+        tiles, values = TilePool.tile_set(lang)
+        self.scorer = PlacementScorer(values, BoardLayout.load(layout))
+
+    def search(self, lines, rack, board, anchors, top):
+        moves = TopMoves(top)
+        for order, move in self.generator.iter_moves(lines, rack, board, self.scorer, moves, anchors):
+            moves.add(order, move)
+        return moves.ordered_moves()
+
+
+_search_worker = None  # the SearchWorker of this process, if it is in a ParallelMoveSearch pool
+
+
+def _start_search_worker(lang, structure, layout):
+    global _search_worker
+    _search_worker = SearchWorker(lang, structure, layout)
+
+
+def _search_anchors(task):
+    return _search_worker.search(*task)
+
+
+class ParallelMoveSearch:
+    """an opt-in move search for BotV1 that splits the anchors of each turn between a pool of processes,
+    each process only sends back its top best moves. the anchors are dealt out in a few chunks per process
+    so the processes finish at about the same time"""
+
+    def __init__(self, processes=None, top=1, lang="en", structure=None, layout="standard", chunks=4):
+        self.processes = os.cpu_count() if processes is None else processes
+        self.top = top
+        self.chunks = self.processes * chunks
+        self.pool = multiprocessing.Pool(self.processes, _start_search_worker, (lang, structure, layout))
+
+    def find_moves(self, lines, rack, board, top=None):
+        # returns the top best (word, root, horizontal?, score) for the lines from BotV1.find_lines, best first,
+        # top is the search's own if not given
+        top = self.top if top is None else top
+        anchors = set()
+        for line, index in zip(lines, range(len(lines))):
+            for position in range(len(line)):
+                if isinstance(line[position], set):
+                    anchors.add((position, index // 2) if index % 2 == 0 else (index // 2, position))
+        anchors = sorted(anchors)
+        # neighbouring anchors usually cost about the same, so they go to different chunks
+        chunks = [set(anchors[i::self.chunks]) for i in range(min(self.chunks, len(anchors)))]
+        # the orders are the same as a search of every anchor gives, so ties come out as they do in BotV1.best_moves
+        words = TopMoves(top)
+        for moves in self.pool.imap(_search_anchors, [(lines, rack, board, chunk, top) for chunk in chunks]):
+            for order, move in moves:
+                words.add(order, move)
+        return words.moves()
+
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
+
 
 if __name__ == "__main__":
-    pass
+    # "python scrabble.py compile en" rebuilds Dictionaries/en.dawg from Dictionaries/en.txt
+    # and "python scrabble.py compile en --gaddag" also rebuilds Dictionaries/en.gaddag
+    if len(sys.argv) > 2 and sys.argv[1] == "compile":
+        structures = [DAWG, GADDAG] if "--gaddag" in sys.argv else [DAWG]
+        for language in [i for i in sys.argv[2:] if i != "--gaddag"]:
+            for structure in structures:
+                t0 = time.time()
+                print("compiled {0} in {1:.2f}s".format(compile_dictionary(language, structure), time.time() - t0))
     """
     player1 = PlayerClient("player 1")
     host = Host(player1)
@@ -0,0 +1,288 @@
+import argparse
+import asyncio
+import concurrent.futures
+import socket
+import threading
+import scrabble
+
+
+class TableHost(scrabble.Host):
+    """a Host that runs as a task on the server's event loop instead of in its own thread"""
+
+    def __init__(self, host_player, lang="en", layout="standard"):
+        super().__init__(host_player, lang, layout)
+        self.inputs = asyncio.Queue()
+
+    async def run_table(self):
+        self.playing = True
+        while self.playing:
+            command = await self.inputs.get()
+            if command is None:
+                # stop() puts None in the queue to wake the loop up
+                continue
+            sender, command = command
+            try:
+                self.handle_command(sender, command)
+            except Exception as error:
+                # commands come from remote players, a bad one is answered instead of ending the table's task
+                self.log.write("warning", "bad_command", player=sender.order, command=command, error=repr(error))
+                sender.send("error1: oh no")
+        self.end_game()
+
+
+class LoopForwarder:
+    """passes the commands a bot sends from an executor thread back to its PlayerHost on the event loop"""
+
+    def __init__(self, player_host, loop):
+        self.player_host = player_host
+        self.loop = loop
+
+    def receive(self, string):
+        self.loop.call_soon_threadsafe(self.player_host.receive, string)
+
+
+class ExecutorBot:
+    """a bot's seat at a table, the messages it gets are handed to the bot one at a time in the
+    server's executor so a slow move search doesn't hold up the other tables"""
+
+    def __init__(self, bot, host, executor):
+        self.bot = bot
+        self.executor = executor
+        self.loop = asyncio.get_running_loop()
+        self.messages = asyncio.Queue()
+        self.host = None
+        host.add_player(self)
+        bot.host = LoopForwarder(self.host, self.loop)
+        bot.host_main = host
+        self.task = self.loop.create_task(self.run())
+
+    def receive(self, command):
+        self.messages.put_nowait(command)
+
+    async def run(self):
+        while True:
+            command = await self.messages.get()
+            if command is None:
+                return
+            await self.loop.run_in_executor(self.executor, self.bot.receive, command)
+
+    def close(self):
+        self.messages.put_nowait(None)
+
+
+class RemotePlayer:
+    """a connected player's seat, messages from the host are written to the socket one per line,
+    or as frames from scrabble.message_codec once the player has sent codec: binary"""
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.host = None  # set by Host.add_player
+        self.table = None
+        self.binary = False
+
+    def receive(self, command):
+        if not self.writer.is_closing():
+            if self.binary:
+                self.writer.write(scrabble.message_codec.encode(scrabble.message_codec.parse(command)))
+            else:
+                self.writer.write((command + "\n").encode())
+
+
+class Table:
+    def __init__(self, name, server):
+        self.name = name
+        self.server = server
+        self.host = None
+        self.seats = []
+        self.task = None
+
+    def join(self, player):
+        if self.task is not None or len(self.seats) >= 4:
+            return False
+        if self.host is None:
+            self.host = TableHost(player, self.server.lang)
+        else:
+            self.host.add_player(player)
+        self.seats.append(player)
+        return True
+
+    def add_bot(self):
+        bot = scrabble.BotV1(dictionary=self.host.words, generator=self.server.new_generator())
+        seat = ExecutorBot(bot, self.host, self.server.executor)
+        self.seats.append(seat)
+
+    def leave(self, player):
+        if self.task is not None:
+            # the game can't go on without them
+            self.host.stop()
+        else:
+            self.host.players.remove(player.host)
+            self.seats.remove(player)
+            if len([i for i in self.seats if isinstance(i, RemotePlayer)]) == 0:
+                self.close()
+
+    def start(self):
+        self.host.set_up_game()
+        self.task = asyncio.get_running_loop().create_task(self.run())
+
+    async def run(self):
+        await self.host.run_table()
+        self.close()
+
+    def close(self):
+        for seat in self.seats:
+            if isinstance(seat, ExecutorBot):
+                seat.close()
+            else:
+                seat.table, seat.host = None, None
+        if self.server.tables.get(self.name) is self:
+            self.server.tables.pop(self.name)
+
+
+class GameServer:
+    """hosts many tables on one asyncio event loop. players connect over TCP or a Unix socket and send
+    the same text commands PlayerHost gets, one per line, and get the host's messages back the same way.
+    before a game starts they can send "join: <table>", "add_bot: <count>" and "start: ".
+    "codec: binary" is answered with the same line, and after it both sides send frames instead of lines"""
+
+    def __init__(self, lang="en", workers=None, gaddag=False):
+        self.lang = lang
+        self.gaddag = gaddag
+        self.tables = {}
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+
+    def new_generator(self):
+        if self.gaddag:
+            return scrabble.GADDAGMoveGenerator(scrabble.dictionaries.get(self.lang, scrabble.GADDAG))
+        return None
+
+    async def handle_connection(self, reader, writer):
+        player = RemotePlayer(writer)
+        try:
+            while True:
+                if player.binary:
+                    header = await reader.readexactly(scrabble.message_codec.header.size)
+                    frame = header + await reader.readexactly(scrabble.message_codec.frame_length(header))
+                    command = scrabble.message_codec.format(scrabble.message_codec.decode(frame))
+                else:
+                    line = await reader.readline()
+                    if not line:
+                        break
+                    command = line.decode().rstrip("\r\n")
+                self.handle_line(player, command)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except ValueError:
+            # a bad frame, there's no telling where the next one starts
+            pass
+        finally:
+            if player.table is not None:
+                player.table.leave(player)
+            writer.close()
+
+    def handle_line(self, player, command):
+        if command[:7] == "codec: ":
+            # answered in the old codec so the player knows where the new one starts
+            player.receive(command)
+            player.binary = command[7:] == "binary"
+        elif player.table is not None and player.table.task is not None:
+            # game commands go straight to the host
+            player.host.receive(command)
+        elif command[:6] == "join: ":
+            if player.table is not None:
+                player.receive("error: already at table {0}".format(player.table.name))
+                return
+            name = command[6:]
+            if name not in self.tables.keys():
+                self.tables[name] = Table(name, self)
+            if self.tables[name].join(player):
+                player.table = self.tables[name]
+                player.receive("table: {0}".format(name))
+            else:
+                player.receive("error: table {0} can't be joined".format(name))
+        elif command[:10] == "protocol: " and player.table is not None:
+            # the host reads it when the game starts
+            player.host.receive(command)
+        elif command[:9] == "add_bot: " and player.table is not None:
+            for i in range(int(command[9:]) if command[9:].isnumeric() else 1):
+                if len(player.table.seats) < 4:
+                    player.table.add_bot()
+        elif command[:7] == "start: " and player.table is not None:
+            player.table.start()
+        else:
+            player.receive("error: unknown command")
+
+    async def serve(self, host="127.0.0.1", port=8765, path=None):
+        if path is not None:
+            server = await asyncio.start_unix_server(self.handle_connection, path)
+        else:
+            server = await asyncio.start_server(self.handle_connection, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+class ServerConnection:
+    """connects a PlayerClient to a GameServer, it takes the place of the PlayerHost the client
+    would use if the host was in the same process"""
+
+    def __init__(self, client, host="127.0.0.1", port=8765, path=None, binary=False):
+        if path is not None:
+            self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.socket.connect(path)
+        else:
+            self.socket = socket.create_connection((host, port))
+        self.client = client
+        client.host = self
+        self.thread = threading.Thread(target=self.listen, daemon=True)
+        self.thread.start()
+        if binary:
+            client.use_binary()
+
+    def receive(self, string):
+        # called by PlayerClient.send, with a frame once the client uses binary
+        if isinstance(string, bytes):
+            self.socket.sendall(string)
+        else:
+            self.socket.sendall((string + "\n").encode())
+
+    def listen(self):
+        file = self.socket.makefile("rb")
+        binary = False
+        while True:
+            if binary:
+                header = file.read(scrabble.message_codec.header.size)
+                if len(header) == 0:
+                    break
+                self.client.receive(header + file.read(scrabble.message_codec.frame_length(header)))
+            else:
+                line = file.readline()
+                if not line:
+                    break
+                line = line.decode().rstrip("\n")
+                if line[:7] == "codec: ":
+                    # the server's answer, everything after it is in the new codec
+                    binary = line[7:] == "binary"
+                else:
+                    self.client.receive(line)
+        file.close()
+
+    def close(self):
+        # the listening thread's file keeps the socket open, shutting it down ends the connection for both
+        try:
+            self.socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.socket.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="runs Scrabble tables for remote players")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", default=None, help="path of a Unix socket to listen on instead of TCP")
+    parser.add_argument("--workers", type=int, default=None, help="threads for bot move searches")
+    parser.add_argument("--gaddag", action="store_true", help="bots use the GADDAG move generator")
+    arguments = parser.parse_args()
+    asyncio.run(GameServer(workers=arguments.workers, gaddag=arguments.gaddag).serve(
+        arguments.host, arguments.port, arguments.unix))
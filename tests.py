@@ -1,5 +1,14 @@
+import asyncio
+import benchmarks
+import main
 import scrabble
+import server
+import tournament
 import random
+import os
+import json
+import threading
+import time
 
 
 def dawg_test(error=None):
@@ -37,7 +46,7 @@ def dawg_test(error=None):
         strings3.append(random.choice(strings1))
         counter += 1
     # tests1 DAWG creation
-    a, b, c, d = [None]*4
+    a, b, c, d, e = [None]*5
     try:
         a = scrabble.DAWG(strings1)
         print("DAWG a: created")
@@ -58,6 +67,11 @@ def dawg_test(error=None):
         print("DAWG d: created")
     except error:
         print("DAWG d: failed", error)
+    try:
+        e = scrabble.DAWG(strings1+strings2+strings3, compact=True)
+        print("DAWG e: created")
+    except error:
+        print("DAWG e: failed", error)
     DAWGs = []
     for key, value in locals().items():
         if isinstance(value, scrabble.DAWG):
@@ -119,6 +133,645 @@ def dawg_test(error=None):
             print("test 4: failed", error)
 
 
+def move_generator_test(file_name="positions.json"):
+    # checks the GADDAG move generator finds the same moves as the DAWG one on the recorded positions
+    # and how long each of them takes
+    positions = benchmarks.read_positions(file_name)
+    dawg = scrabble.dictionaries.get("en")
+    generators = [["DAWG", scrabble.DAWGMoveGenerator(dawg), 0],
+                  ["GADDAG", scrabble.GADDAGMoveGenerator(scrabble.dictionaries.get("en", scrabble.GADDAG)), 0]]
+    bot = scrabble.BotV1(dictionary=dawg)
+    for position, index in zip(positions, range(len(positions))):
+        bot.board = [list(row) for row in position["board"]]
+        bot.tiles = list(position["rack"])
+        moves = []
+        for generator in generators:
+            lines = bot.find_lines()
+            t0 = time.time()
+            moves.append(set(generator[1].find_words(lines, bot.tiles)))
+            generator[2] += time.time() - t0
+        if moves[0] == moves[1]:
+            print("position {0}: {1} moves, same".format(index, len(moves[0])))
+        else:
+            print("position {0}: different, {1} only DAWG, {2} only GADDAG".format(
+                index, len(moves[0] - moves[1]), len(moves[1] - moves[0])))
+    for name, generator, total in generators:
+        print("{0}: {1:.3f}s".format(name, total))
+
+
+def cross_check_test(file_name="positions.json"):
+    # goes through the recorded positions with one bot, so the kept cross checks are updated from each
+    # position to the next, and checks them against a full recompute
+    positions = benchmarks.read_positions(file_name)
+    bot = scrabble.BotV1()
+    bot.debug_cross_checks = True
+    for position, index in zip(positions, range(len(positions))):
+        bot.board = [list(row) for row in position["board"]]
+        try:
+            bot.do_cross_checks()
+            print("position {0}: {1} anchors, same".format(index, len(bot.potential_anchors)))
+        except RuntimeError as error:
+            print("position {0}: failed".format(index), error)
+
+
+def parallel_search_test(file_name="positions.json", processes=4, top=10):
+    # checks the best moves from a ParallelMoveSearch match BotV1.best_moves searching all the anchors in one
+    # process, moves with the same score in the same order
+    positions = benchmarks.read_positions(file_name)
+    search = scrabble.ParallelMoveSearch(processes=processes, top=top)
+    bot = scrabble.BotV1()
+    bot.host_main = scrabble.Host(scrabble.PlayerClient("test"))
+    for position, index in zip(positions, range(len(positions))):
+        bot.board = [list(row) for row in position["board"]]
+        bot.tiles = list(position["rack"])
+        lines = bot.find_lines()
+        serial = bot.best_moves(top, lines)
+        parallel = search.find_moves(lines, bot.tiles, bot.board)
+        if serial == parallel:
+            print("position {0}: best {1}, same".format(index, [i[3] for i in parallel[:1]]))
+        else:
+            print("position {0}: different, {1} serial, {2} parallel".format(index, serial, parallel))
+    # best_moves asks the search for k moves, not just its own top
+    bot.search = search
+    print("best_moves({0}): {1} moves".format(top * 2, len(bot.best_moves(top * 2, lines))))
+    search.close()
+
+
+def results_file_test(file_name="test_results.scr"):
+    # writes a results file and reads it back
+    games = {"game": [0, 1], "seed": [7, 8], "bots": ["BotV1,BotV1", "BotV1,BotV1,BotV1"], "score_0": [300, -5],
+             "score_1": [250, 410], "score_2": [0, 120], "score_3": [0, 0], "winner": [0, 1], "moves": [30, 41],
+             "finished": [1, 0], "seconds": [1.5, 2.25]}
+    moves = {"game": [0, 0, 1], "move": [0, 1, 0], "player": [0, 1, 0], "action": [0, 1, 2], "points": [14, 0, 0],
+             "latency": [0.5, 0.25, 0.0], "tiles": ["PAYOUT", "", "\u00c9T\u00c9"]}
+    tournament.write_results(file_name, {"games": (tournament.GAME_COLUMNS, games),
+                                         "moves": (tournament.MOVE_COLUMNS, moves)})
+    tables = tournament.read_results(file_name)
+    os.remove(file_name)
+    print("games: {0}".format("same" if tables["games"] == games else tables["games"]))
+    print("moves: {0}".format("same" if tables["moves"] == moves else tables["moves"]))
+
+
+def replay_test(seed=1):
+    # plays a game between two bots and then plays it again from its seed and commands
+    host, bots = benchmarks.bot_game(seed)
+    replay = scrabble.Host.replay(seed, host.commands)
+    if replay.board == host.board and [i.score for i in replay.players] == [i.score for i in host.players]:
+        print("replay: {0} commands, same".format(len(host.commands)))
+    else:
+        print("replay: different")
+
+
+def board_test(file_name="positions.json"):
+    # checks the occupancy bitmasks and anchors of Board against the lists, and that undo puts a board back
+    positions = benchmarks.read_positions(file_name)
+    bot = scrabble.BotV1()
+    for position, index in zip(positions, range(len(positions))):
+        bot.board = [list(row) for row in position["board"]]
+        board = scrabble.Board(bot.board)
+        same = True
+        for y in range(15):
+            for x in range(15):
+                if board.occupied(x, y) != (bot.board[y][x] != " ") or board.is_anchor(x, y) != bot.is_anchor(x, y):
+                    same = False
+        before = board.copy()
+        undo = board.apply([(x, 7) for x in range(15) if board.get(x, 7) == " "][:3], "ABC")
+        board.undo(undo)
+        print("position {0}: {1}, undo {2}".format(index, "same" if same else "different",
+                                                   "same" if board == before == bot.board else "different"))
+    board = scrabble.Board()
+    print("compared to None {0}, 5 {1}, a short list {2}, empty rows {3}".format(
+        board == None, board == 5, board == [[" "] * 15], board == [[" "] * 15 for i in range(15)]))
+
+
+def delta_protocol_test(seed=2):
+    # plays a game between a bot using deltas and one using whole boards, both should end up with the host's board
+    bots = [scrabble.BotV1(), scrabble.BotV1()]
+    bots[1].delta = False
+    host, bots = benchmarks.bot_game(seed, bots=bots)
+    for bot in bots:
+        print("delta {0}: {1}".format(bot.delta, "same" if host.board == bot.board else "different"))
+
+
+def codec_test(seed=3):
+    # every message of a game should come back the same after being made into a frame and back,
+    # and a game where one bot uses frames should go the same as one where neither does
+    codec = scrabble.message_codec
+    messages = benchmarks.record_messages(seed)
+    changed = [i for i in messages if codec.format(codec.decode(codec.encode(codec.parse(i)))) != i]
+    print("codec: {0} messages, {1} changed".format(len(messages), len(changed)))
+    scores = []
+    for binary in [False, True]:
+        host, bots = benchmarks.bot_game(seed, (lambda host, bots: bots[1].use_binary()) if binary else None)
+        scores.append([player.score for player in host.players])
+    print("codec: scores {0}".format("same" if scores[0] == scores[1] else "different"))
+
+
+def validation_test(file_name="positions.json", count=2000, seed=0):
+    # tries random placements on the recorded positions and checks validating them on their own
+    # agrees with validating and scoring the whole board
+    positions = benchmarks.read_positions(file_name)
+    rng = random.Random(seed)
+    host = scrabble.Host(scrabble.PlayerClient("test"))
+    letters = [chr(i) for i in range(ord("A"), ord("Z") + 1)] + ["*"]
+    failed, valid = 0, 0
+    for i in range(count):
+        host.board = scrabble.Board(rng.choice(positions)["board"])
+        # a run of tiles from a random square, sometimes with one moved off the line
+        x, y, dx, dy = rng.randrange(15), rng.randrange(15), *rng.choice([(1, 0), (0, 1)])
+        squares = []
+        while len(squares) < rng.randint(1, 7) and x < 15 and y < 15:
+            if not host.board.occupied(x, y):
+                squares.append((x, y))
+            x, y = x + dx, y + dy
+        if len(squares) > 1 and rng.random() < 0.2:
+            moved = (squares[-1][0] + dy, squares[-1][1] + dx)
+            if moved[0] < 15 and moved[1] < 15 and not host.board.occupied(*moved):
+                squares[-1] = moved
+        placed = [rng.choice(letters) for square in squares]
+        # blanks are placed as the letter they stand for, in lower case
+        placed = [rng.choice(letters[:-1]).lower() if i == "*" else i for i in placed]
+        try:
+            is_valid = host.is_valid_placement(squares)
+            valid += is_valid
+            illegal_words = host.find_illegal_placement_words(squares, placed) if is_valid else []
+            score = host.score_placement(squares, placed) if is_valid and len(illegal_words) == 0 else 0
+            host.check_placement(squares, placed, is_valid, illegal_words, score)
+        except RuntimeError as error:
+            failed += 1
+            print("placement {0}: failed".format(squares), error)
+    print("validation: {0} placements, {1} valid, {2} failed".format(count, valid, failed))
+
+
+def pattern_cache_test():
+    # the cache should give the same matches as searching, and drop the least recently used pattern when full
+    dawg = scrabble.DAWG(["CATS", "CAPS", "COTS", "DOGS", "DIGS"])
+    dawg.pattern_cache = scrabble.PatternCache(2)
+    for pattern in ["CA*S", "D**S", "CA*S", "*O*S"]:
+        if dawg.find(pattern) != dawg.search(pattern):
+            print("pattern cache: {0} different".format(pattern))
+    stats = dawg.pattern_cache.stats()
+    print("pattern cache: {0}, {1}".format(stats, list(dawg.pattern_cache.entries.keys())))
+    # 1 hit, 3 misses, D**S evicted as CA*S was used after it
+
+
+def anagram_test(file_name="positions.json"):
+    # the anagram index should find the same rack words as checking every word, and a bot using it for
+    # bingos should play the same moves as one that doesn't
+    file = open("Dictionaries/en.txt", "r")
+    words = [i.replace("\n", "") for i in file.readlines()]
+    file.close()
+    index = scrabble.dictionaries.get("en", scrabble.AnagramIndex)
+    for rack in ["RETAINS", "QI*ZATE", "**E"]:
+        expected = set([])
+        for word in words:
+            left = list(rack)
+            for letter in word:
+                if letter in left or "*" in left:
+                    left.remove(letter if letter in left else "*")
+                else:
+                    break
+            else:
+                if len(word) > 1:
+                    expected.add(word)
+        found = set([word for word, blanks in index.find(rack)])
+        print("anagrams {0}: {1} words, {2}".format(rack, len(found), "same" if found == expected else "different"))
+    positions = benchmarks.read_positions(file_name)
+    host = scrabble.Host(scrabble.PlayerClient("test"))
+    for position, index_number in zip(positions, range(len(positions))):
+        moves = []
+        for anagrams in [None, index]:
+            bot = scrabble.BotV1(anagrams=anagrams)
+            bot.host_main = host
+            bot.log = None
+            bot.board = [list(row) for row in position["board"]]
+            bot.tiles = list(position["rack"])
+            move, board, rack = bot.find_move()
+            moves.append(board.to_string() if move else None)
+        print("position {0}: {1}".format(index_number, "same" if moves[0] == moves[1] else "different"))
+
+
+def top_moves_test(file_name="positions.json", k=10):
+    # the k best moves from the bounded search should be the first k of every move sorted by score,
+    # ties in the same order, with both generators
+    positions = benchmarks.read_positions(file_name)
+    host = scrabble.Host(scrabble.PlayerClient("test"))
+    gaddag = scrabble.GADDAGMoveGenerator(scrabble.dictionaries.get("en", scrabble.GADDAG))
+    for position, index in zip(positions, range(len(positions))):
+        results = []
+        for generator in [None, gaddag]:
+            bot = scrabble.BotV1(generator=generator)
+            bot.host_main = host
+            bot.board = [list(row) for row in position["board"]]
+            bot.tiles = list(position["rack"])
+            lines = bot.find_lines()
+            words = bot.score_words(bot.generator.find_words(lines, bot.tiles), bot.board, host)
+            words.sort(key=lambda x: x[3], reverse=True)
+            stats = scrabble.TurnStats(0)
+            results.append(bot.best_moves(k, lines, stats) == words[:k])
+        print("position {0}: {1}, {2} of {3} anchors searched".format(
+            index, "same" if False not in results else "different", stats.counters.get("anchors_searched", 0),
+            stats.counters.get("anchors_searched", 0) + stats.counters.get("anchors_pruned", 0)))
+
+
+def blank_test():
+    # a blank has to be placed as the lower case letter it stands for, which is kept on the board and scores 0,
+    # and is swapped as "*"
+    messages = []
+    players = [scrabble.PlayerClient("test {0}".format(i), update=messages.extend) for i in [1, 2]]
+    host = scrabble.Host(players[0], seed=0)
+    host.add_player(players[1])
+    host.set_up_game()
+    for word, rack in [("C*T", "ABCDE"), ("CaT", "ABCDE")]:
+        sender = host.players[host.current_player]
+        board = [" " * 15 for i in range(15)]
+        board[7] = " " * 6 + word + " " * 6
+        host.handle_command(sender, "place: {0}/{1}".format("".join(board), rack))
+        print("{0}: board {1}, score {2}".format(word, host.board[7].strip() or "empty", sender.score))
+    print("illegal words: {0}".format(host.find_illegal_placement_words([(6, 8), (7, 8)], ["z", "Q"])))
+    for tiles in ["e", "*"]:
+        sender, current_player = host.players[host.current_player], host.current_player
+        sender.tiles = list("ABCDEF*")
+        del messages[:]
+        host.handle_command(sender, "swap: " + tiles)
+        print("swap {0}: errors {1}, rack {2}, passed {3}".format(
+            tiles, len([i for i in messages if i[0] == "error1"]), "".join(sorted(sender.tiles)),
+            host.current_player != current_player))
+
+
+def compiled_dictionary_test(file_name="test_dictionary.dawg"):
+    # a saved DAWG should load with the same words, and files with the wrong magic, version or length are refused
+    words = ["AAA", "AAB", "ABA", "BAA", "CAT", "CATS", "DOG"]
+    dawg = scrabble.DAWG(words)
+    dawg.save(file_name, fingerprint=b"f" * 20)
+    loaded = scrabble.DAWG.load(file_name)
+    same = [loaded.contains(i) for i in words + ["AB", "CA", "CATT"]] == \
+        [dawg.contains(i) for i in words + ["AB", "CA", "CATT"]] and \
+        sorted(loaded.find("*A*")) == sorted(dawg.search("*A*"))
+    print("round trip: {0}, fingerprint {1}".format("same" if same else "different",
+                                                    "kept" if loaded.fingerprint == b"f" * 20 else "lost"))
+    file = open(file_name, "rb")
+    data = file.read()
+    file.close()
+    for name, bad in [("magic", b"XXXX" + data[4:]), ("version", data[:4] + (99).to_bytes(4, "little") + data[8:]),
+                      ("truncated", data[:-4])]:
+        file = open(file_name + "." + name, "wb")
+        file.write(bad)
+        file.close()
+        try:
+            scrabble.DAWG.load(file_name + "." + name)
+            print("bad {0}: loaded".format(name))
+        except ValueError:
+            print("bad {0}: refused".format(name))
+        os.remove(file_name + "." + name)
+    os.remove(file_name)
+    print("temporary files left: {0}".format(len([i for i in os.listdir(".") if i.startswith(file_name + ".")])))
+
+
+def registry_test(lang="test_registry"):
+    # the registry should compile a missing dictionary, share it, reload it when the word list changes
+    # and fall back to the compiled file when the word list is gone
+    text_file, binary_file = "Dictionaries/" + lang + ".txt", "Dictionaries/" + lang + ".dawg"
+    file = open(text_file, "w")
+    file.write("CAT\nDOG\n")
+    file.close()
+    registry = scrabble.DictionaryRegistry()
+    dawg = registry.get(lang)
+    print("missing file: compiled {0}, shared {1}, words {2}".format(
+        os.path.exists(binary_file), registry.get(lang) is dawg, [dawg.contains("CAT"), dawg.contains("COW")]))
+    file = open(text_file, "a")
+    file.write("COW\n")
+    file.close()
+    dawg = registry.get(lang)
+    print("changed word list: words {0}, loaded {1}".format([dawg.contains("CAT"), dawg.contains("COW")],
+                                                            len(registry.loaded())))
+    os.remove(text_file)
+    dawg = scrabble.DictionaryRegistry().get(lang)
+    print("missing word list: words {0}".format([dawg.contains("CAT"), dawg.contains("COW")]))
+    os.remove(binary_file)
+
+
+def table_host_test():
+    # commands a remote player could send that the host can't play should get error1 and leave the table running
+    async def play():
+        messages = []
+        players = [scrabble.PlayerClient("test {0}".format(i), update=messages.extend) for i in range(2)]
+        host = server.TableHost(players[0])
+        host.add_player(players[1])
+        host.set_up_game()
+        task = asyncio.get_running_loop().create_task(host.run_table())
+        sender = host.players[0]
+        host.current_player = sender.order
+        for command in ["place: x", "move: 7,7,h", "swap: 12", "pass: "]:
+            host.inputs.put_nowait([sender, command])
+        await asyncio.sleep(0.1)
+        running = not task.done()
+        host.stop()
+        await task
+        return running, host.current_player, [operand for opcode, operand in messages if opcode == "error1"]
+    running, current_player, errors = asyncio.run(play())
+    print("table running: {0}, errors: {1}, passed: {2}".format(running, len(errors), current_player == 1))
+
+
+def layout_test(file_name="layouts.json"):
+    # each layout should be built once from layouts.json with its premium squares in the flat grids
+    file = open(file_name, "r")
+    bonus_tiles = json.loads("".join(file.readlines()))["standard"]
+    file.close()
+    layout = scrabble.BoardLayout.load("standard", file_name)
+    print("shared: {0}".format(layout is scrabble.BoardLayout.load("standard", file_name)))
+    for bonus, grid, multiplier in [("DL", layout.letter_multipliers, 2), ("TL", layout.letter_multipliers, 3),
+                                    ("DW", layout.word_multipliers, 2), ("TW", layout.word_multipliers, 3)]:
+        squares = set([tuple(i) for i in bonus_tiles[bonus]])
+        found = set([(i % 15, i // 15) for i in range(225) if grid[i] == multiplier])
+        print("{0}: {1} squares, {2}".format(bonus, len(squares), "same" if squares == found else "different"))
+    print("centre {0}, corner {1}".format(layout.word_multiplier(7, 7), layout.word_multiplier(0, 0)))
+    try:
+        scrabble.BoardLayout.load("no such layout", file_name)
+        print("unknown layout: loaded")
+    except KeyError:
+        print("unknown layout: refused")
+
+
+def server_test(path="test_server.sock", timeout=10):
+    # a client connected over a Unix socket should get answers in the lobby and its tiles once a game with a bot starts
+    game_server = server.GameServer()
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    asyncio.run_coroutine_threadsafe(game_server.serve(path=path), loop)
+    t0 = time.time()
+    while not os.path.exists(path) and time.time() - t0 < timeout:
+        time.sleep(0.01)
+    messages = []
+    client = scrabble.PlayerClient("test", update=messages.extend)
+    connection = server.ServerConnection(client, path=path)
+    for command in ["hello: ", "join: test", "add_bot: 1", "start: "]:
+        client.send(command)
+    while client.tiles is None and time.time() - t0 < timeout:
+        time.sleep(0.01)
+    opcodes = [opcode for opcode, operand in messages]
+    print("lobby: {0}, tiles: {1}, tables: {2}".format(
+        [i for i in ["error", "table"] if i in opcodes], len(client.tiles or []), list(game_server.tables.keys())))
+    connection.close()
+    # leaving stops the game, the table closes once its task has ended
+    while len(game_server.tables) > 0 and time.time() - t0 < timeout:
+        time.sleep(0.01)
+    print("left: table {0}".format("closed" if len(game_server.tables) == 0 else "still open"))
+
+    async def shut_down():
+        # waits for the bots to finish, until only this and the server are left, then stops the server
+        while len(asyncio.all_tasks()) > 2 and time.time() - t0 < timeout:
+            await asyncio.sleep(0.01)
+        tasks = [i for i in asyncio.all_tasks() if i is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    asyncio.run_coroutine_threadsafe(shut_down(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    os.remove(path)
+
+
+def game_log_test(file_name="test_logs/game.jsonl"):
+    # records below the level should be dropped, close should write the rest and a write after it start again
+    log = scrabble.GameLog(file_name, level="info", flush_interval=0.05)
+    log.write("debug", "dropped")
+    log.write("info", "first", value=1)
+    log.write("warning", "second")
+    print("enabled: debug {0}, info {1}".format(log.enabled("debug"), log.enabled("info")))
+    log.close()
+    file = open(file_name, "r")
+    events = [json.loads(line)["event"] for line in file.readlines()]
+    file.close()
+    print("closed: {0}, thread {1}".format(events, "stopped" if log.thread is None else "running"))
+    log.set_level("debug")
+    log.write("debug", "third")
+    log.close()
+    file = open(file_name, "r")
+    events = [json.loads(line)["event"] for line in file.readlines()]
+    file.close()
+    print("reopened: {0}".format(events))
+    os.remove(file_name)
+    os.rmdir(os.path.dirname(file_name))
+
+
+class ObserverCanvas:
+    """GameCanvas.on_update with the drawing left out, the boards it would draw are kept instead"""
+    on_update = main.GameCanvas.on_update
+
+    def __init__(self):
+        self.player = None
+        self.drawn = []
+
+    def set_board(self):
+        self.drawn.append(scrabble.Board(self.player.board))
+
+    def set_tiles(self, tiles):
+        pass
+
+    def create_player_list(self):
+        pass
+
+    def set_tile_pool(self):
+        pass
+
+    def update_player_list(self):
+        pass
+
+    def set_error_line(self, error=" "):
+        pass
+
+
+def observer_test(seed=4, moves=6):
+    # the GUI in observer mode watches the game through a bot, which gets deltas, and should redraw the board
+    # after every move. the game is stopped after a few moves
+    canvas = ObserverCanvas()
+    canvas.player = scrabble.BotV1(update=canvas.on_update)
+    boards = []
+
+    def prepare(host, bots):
+        def watch(sender, command):
+            host.handle_command_unwatched(sender, command)
+            if host.board != (boards[-1] if len(boards) > 0 else scrabble.Board()):
+                boards.append(host.board.copy())
+            if len(boards) >= moves:
+                host.playing = False
+        host.handle_command_unwatched, host.handle_command = host.handle_command, watch
+    host, bots = benchmarks.bot_game(seed, prepare, bots=[canvas.player, scrabble.BotV1()])
+    redrawn = len([i for i in boards if i in canvas.drawn])
+    print("observer: delta {0}, {1} of {2} boards drawn, last {3}".format(
+        canvas.player.delta, redrawn, len(boards), "same" if canvas.drawn[-1:] == [host.board] else "different"))
+
+
+class ListRackDAWG:
+    """DAWG.find_left_side and find_right_side as they were with the rack as a list of tiles, on the nodes of dawg"""
+
+    def __init__(self, dawg):
+        self.nodes = dawg.nodes
+
+    def find_left_side(self, rack, max_len, node=0):
+        if max_len == 0 or len(rack) == 0:
+            return []
+        else:
+            rtn = []
+            if "*" in rack:
+                for letter in self.nodes[node].keys():
+                    new_rack = list(rack)
+                    new_rack.pop(new_rack.index("*"))
+                    l = self.find_left_side(new_rack, max_len - 1, node=self.nodes[node][letter][0])
+                    for i in range(len(l)):
+                        l[i] = letter.lower() + l[i]
+                    rtn += l + [letter.lower()]
+            for letter in set(rack):
+                if letter in self.nodes[node].keys():
+                    new_rack = list(rack)
+                    new_rack.pop(new_rack.index(letter))
+                    l = self.find_left_side(new_rack, max_len - 1, node=self.nodes[node][letter][0])
+                    for i in range(len(l)):
+                        l[i] = letter + l[i]
+                    rtn += l + [letter]
+            return rtn
+
+    def find_right_side(self, word, rack, node=0, right_side=False):
+        if len(word) > 0 and isinstance(word[0], set):
+            right_side = True
+        if right_side:
+            rtn = []
+            letters = word[0]
+            if letters in ["*", " "]:
+                letters = set([chr(i) for i in range(ord("A"), ord("Z") + 1)])
+            for letter in letters:
+                if letter in rack and letter in self.nodes[node].keys():
+                    new_rack = list(rack)
+                    new_rack.pop(rack.index(letter))
+                    new_node = self.nodes[node][letter][0]
+                    if self.nodes[node][letter][1] and \
+                            (len(word) == 1 or word[1] in ["*", " "] or isinstance(word[1], set)):
+                        rtn += letter
+                    if len(word) > 1:
+                        tmp = self.find_right_side(word[1:], new_rack, new_node, right_side=True)
+                        rtn += [letter + i for i in tmp]
+                if "*" in rack and letter in self.nodes[node].keys():
+                    new_rack = list(rack)
+                    new_rack.pop(rack.index("*"))
+                    new_node = self.nodes[node][letter][0]
+                    if self.nodes[node][letter][1] and \
+                            (len(word) == 1 or word[1] in ["*", " "] or isinstance(word[1], set)):
+                        rtn += letter.lower()
+                    if len(word) > 1:
+                        tmp = self.find_right_side(word[1:], new_rack, new_node, right_side=True)
+                        rtn += [letter.lower() + i for i in tmp]
+            return rtn
+        else:
+            rack = list(rack)
+            if word[0].isupper():
+                rack.pop(rack.index(word[0]))
+            else:
+                rack.pop(rack.index("*"))
+            if word[0].upper() not in self.nodes[node].keys():
+                return []
+            node = self.nodes[node][word[0].upper()][0]
+            rtn = self.find_right_side(word[1:], rack, node=node, right_side=right_side)
+            return [word[0] + i for i in rtn]
+
+
+def rack_counts_test(file_name="positions.json", count=200, seed=0):
+    # the left and right part search on a rack of counts should give the same lists, in the same order, as
+    # searching with a list of tiles, for every call the move generator makes on the recorded positions
+    # and for the left parts of random racks
+    positions = benchmarks.read_positions(file_name)
+    # its own copy, as the searches are swapped for checked ones
+    dawg = scrabble.load_dictionary("en")
+    reference = ListRackDAWG(dawg)
+    calls = {"find_left_side": [0, 0], "find_right_side": [0, 0]}  # name -> [calls, different]
+
+    def check(name):
+        search = getattr(dawg, name)
+
+        def checked(*args, **kwargs):
+            words = search(*args, **kwargs)
+            calls[name][0] += 1
+            if words != getattr(reference, name)(*args, **kwargs):
+                calls[name][1] += 1
+            return words
+        setattr(dawg, name, checked)
+    check("find_left_side")
+    check("find_right_side")
+    bot = scrabble.BotV1(dictionary=dawg)
+    for position in positions:
+        bot.board = [list(row) for row in position["board"]]
+        bot.tiles = list(position["rack"])
+        bot.generator.find_words(bot.find_lines(), bot.tiles)
+    random.seed(seed)
+    tiles = list(scrabble.TilePool.tile_set("en")[0])
+    for i in range(count):
+        rack = random.sample(tiles, 7)
+        dawg.find_left_side(rack, random.randint(1, 7))
+    for name in sorted(calls.keys()):
+        print("{0}: {1} calls, {2} different".format(name, calls[name][0], calls[name][1]))
+
+
+def search_stats_test(file_name="positions.json"):
+    # a turn's stats should have the generator's phases and nodes visited, also when whoever uses
+    # iter_moves stops after the first move
+    position = benchmarks.read_positions(file_name)[-1]
+    host = scrabble.Host(scrabble.PlayerClient("test"))
+    gaddag = scrabble.GADDAGMoveGenerator(scrabble.dictionaries.get("en", scrabble.GADDAG))
+    for generator in [None, gaddag]:
+        bot = scrabble.BotV1(generator=generator)
+        bot.host_main = host
+        bot.log = None
+        bot.board = [list(row) for row in position["board"]]
+        bot.tiles = list(position["rack"])
+        bot.find_move()
+        stopped = scrabble.TurnStats(0)
+        moves = bot.generator.iter_moves(bot.find_lines(), bot.tiles, bot.board, host.scorer, stats=stopped)
+        next(moves)
+        moves.close()
+        for name, stats in [("find_move", bot.last_stats), ("stopped", stopped)]:
+            print("{0} {1}: {2}, {3} nodes visited, {4} anchors searched".format(
+                type(bot.generator).__name__, name, sorted([i for i in bot.generator.phases if i in stats.phases]),
+                stats.counters.get("nodes_visited", 0), stats.counters.get("anchors_searched", 0)))
+
+
+def compact_node_test():
+    # a CompactNode should answer "in" and [] like the dict node it replaces, for any string key
+    dawg = scrabble.DAWG(["AB", "AC", "B"])
+    compact = scrabble.DAWG(["AB", "AC", "B"], compact=True)
+    for key in ["A", "B", "C", "AB", "", "["]:
+        found = [key in dawg.nodes[0], key in compact.nodes[0]]
+        print("{0!r}: {1}".format(key, "same" if found[0] == found[1] else "different"))
+    try:
+        compact.nodes[0]["AB"]
+        print("'AB': no KeyError")
+    except KeyError:
+        print("'AB': KeyError")
+
+
+def swap_test():
+    # a swap of more tiles than the bag has left gets error1 and changes nothing, as the player would get fewer back
+    messages = []
+    players = [scrabble.PlayerClient("test {0}".format(i), update=messages.extend) for i in [1, 2]]
+    host = scrabble.Host(players[0], seed=0)
+    host.add_player(players[1])
+    host.set_up_game()
+    del host.tiles.tiles[3:]
+    for tiles in ["ABCDE", "ABC"]:
+        sender, current_player = host.players[host.current_player], host.current_player
+        sender.tiles = list("ABCDEFG")
+        del messages[:]
+        host.handle_command(sender, "swap: " + tiles)
+        print("swap {0} from 3: errors {1}, {2} tiles, passed {3}".format(
+            tiles, len([i for i in messages if i[0] == "error1"]), len(sender.tiles),
+            host.current_player != current_player))
+    try:
+        host.tiles.swap(list("ABCDE"))
+        print("pool swap: no AssertionError")
+    except AssertionError:
+        print("pool swap: AssertionError")
+
+
 if __name__ == "__main__":
     # dawg_test()
     dawg = scrabble.DAWG(["AAA", "ABA", "AAB"])
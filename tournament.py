@@ -0,0 +1,226 @@
+import argparse
+import array
+import json
+import multiprocessing
+import os
+import struct
+import sys
+import time
+import scrabble
+
+
+RESULTS_VERSION = 1
+RESULTS_HEADER = "<4sII"  # magic, version, length of the json schema after it
+RESULTS_MAGIC = b"SCRR"
+# columns are (name, array typecode), "s" columns are strings stored as uint32 offsets followed by utf-8
+GAME_COLUMNS = [("game", "I"), ("seed", "I"), ("bots", "s"), ("score_0", "i"), ("score_1", "i"),
+                ("score_2", "i"), ("score_3", "i"), ("winner", "b"), ("moves", "H"), ("finished", "B"),
+                ("seconds", "f")]
+MOVE_COLUMNS = [("game", "I"), ("move", "H"), ("player", "B"), ("action", "B"), ("points", "i"),
+                ("latency", "f"), ("tiles", "s")]
+ACTIONS = ["place", "swap", "pass"]  # anything else is stored as len(ACTIONS)
+
+
+def write_results(file_name, tables):
+    # tables is {name: (columns, {column name: list of values})}, each table is written column after column
+    schema = {}
+    for name, (columns, values) in tables.items():
+        schema[name] = {"rows": len(values[columns[0][0]]), "columns": columns}
+    schema = json.dumps(schema).encode()
+    # written to its own temporary file first, like the dictionaries, so runs writing the same results
+    # at once never write to each other's file
+    file, temporary_name = scrabble.temporary_file(file_name)
+    try:
+        with file:
+            file.write(struct.pack(RESULTS_HEADER, RESULTS_MAGIC, RESULTS_VERSION, len(schema)))
+            file.write(schema)
+            for name, (columns, values) in tables.items():
+                for column, typecode in columns:
+                    if typecode == "s":
+                        strings = [i.encode() for i in values[column]]
+                        offsets = array.array("I", [0])
+                        for string in strings:
+                            offsets.append(offsets[-1] + len(string))
+                        column_values, blob = offsets, b"".join(strings)
+                    else:
+                        column_values, blob = array.array(typecode, values[column]), b""
+                    if sys.byteorder != "little":
+                        column_values.byteswap()
+                    column_values.tofile(file)
+                    file.write(blob)
+    except BaseException:
+        os.remove(temporary_name)
+        raise
+    scrabble.replace_file(file, temporary_name, file_name)
+
+
+def read_results(file_name):
+    # returns {table name: {column name: list of values}} from a file written by write_results
+    file = open(file_name, "rb")
+    data = file.read()
+    file.close()
+    magic, version, schema_length = struct.unpack_from(RESULTS_HEADER, data)
+    if magic != RESULTS_MAGIC or version != RESULTS_VERSION:
+        raise ValueError("{0} is not a version {1} results file".format(file_name, RESULTS_VERSION))
+    start = struct.calcsize(RESULTS_HEADER)
+    schema = json.loads(data[start:start + schema_length].decode())
+    start += schema_length
+    tables = {}
+    for name, table in schema.items():
+        tables[name] = {}
+        for column, typecode in table["columns"]:
+            column_values = array.array("I" if typecode == "s" else typecode)
+            count = table["rows"] + 1 if typecode == "s" else table["rows"]
+            column_values.frombytes(data[start:start + count * column_values.itemsize])
+            if sys.byteorder != "little":
+                column_values.byteswap()
+            start += count * column_values.itemsize
+            if typecode == "s":
+                blob = data[start:start + column_values[-1]]
+                start += column_values[-1]
+                column_values = [blob[column_values[i]:column_values[i + 1]].decode()
+                                 for i in range(table["rows"])]
+            tables[name][column] = list(column_values)
+    return tables
+
+
+class TurnTimer:
+    """wraps a player's update to time how long it takes to answer when it's their turn"""
+
+    def __init__(self, player):
+        self.player = player
+        self.update = player.update
+        self.last = 0.0
+        player.update = self
+
+    def __call__(self, types):
+        t0 = time.perf_counter()
+        self.update(types)
+        if "current_player" in [i[0] for i in types] and self.player.current_player == self.player.order:
+            self.last = time.perf_counter() - t0
+
+
+class RecordingHost(scrabble.Host):
+    """a Host that keeps a row for every move played and ends the game after max_moves"""
+
+    def __init__(self, host_player, lang="en", layout="standard", seed=None, max_moves=500):
+        super().__init__(host_player, lang, layout, seed)
+        self.max_moves = max_moves
+        self.timers = {}  # player -> TurnTimer
+        self.moves = []  # [player, action, points, latency, tiles placed]
+
+    def handle_command(self, sender, command):
+        board = self.board.copy()
+        score = sender.score
+        played = len(self.commands)
+        super().handle_command(sender, command)
+        if len(self.commands) == played:
+            # not a move, e.g. out of turn or choosing the protocol
+            return
+        placed = "".join([self.board.get(x, y) for x, y in board.difference(self.board)])
+        action = command[:command.find(":")]
+        # a move is a placement sent as a delta
+        action = "place" if action == "move" else action
+        timer = self.timers.get(sender.player)
+        self.moves.append([sender.order, ACTIONS.index(action) if action in ACTIONS else len(ACTIONS),
+                           sender.score - score, 0.0 if timer is None else timer.last, placed])
+        if len(self.moves) >= self.max_moves:
+            self.playing = False
+
+
+def make_bot(name, dictionary, structure):
+    # name is a class in scrabble, e.g. "BotV1", or "module.Class"
+    if "." in name:
+        module, name = name.rsplit(".", 1)
+        bot_class = getattr(__import__(module), name)
+    else:
+        bot_class = getattr(scrabble, name)
+    bot = bot_class(dictionary=dictionary)
+    if structure is scrabble.GADDAG and hasattr(bot, "generator"):
+        bot.generator = scrabble.GADDAGMoveGenerator(scrabble.dictionaries.get("en", scrabble.GADDAG))
+    # keeps the bot from writing a log record for every move
+    bot.log = None
+    return bot
+
+
+def play_game(task):
+    # plays one game in this process and returns (game row, move rows)
+    game, seed, bot_names, structure, max_moves = task
+    t0 = time.time()
+    bots = [make_bot(name, scrabble.dictionaries.get("en"), structure) for name in bot_names]
+    host = RecordingHost(bots[0], seed=seed, max_moves=max_moves)
+    for bot in bots[1:]:
+        host.add_player(bot)
+    for bot in bots:
+        bot.host_main = host
+        host.timers[bot] = TurnTimer(bot)
+    # the game is played on this thread, there's no need to start the Host's
+    host.set_up_game()
+    host.game_loop()
+    scores = [0] * 4
+    winner, winning_score = -1, 0
+    for player in host.players:
+        scores[player.order] = player.score
+        if player.score > winning_score:
+            winner, winning_score = player.order, player.score
+    game_row = [game, seed, ",".join(bot_names)] + scores + \
+               [winner, len(host.moves), len(host.moves) < max_moves, time.time() - t0]
+    move_rows = [[game, i] + host.moves[i] for i in range(len(host.moves))]
+    return game_row, move_rows
+
+
+def run_tournament(bot_names, games, processes=None, seed=0, structure=None, max_moves=500, file_name=None):
+    # plays games between bot_names in a pool of processes, game i uses seed + i for its tile pool
+    # and returns the tables written by write_results
+    tasks = [(game, seed + game, bot_names, structure, max_moves) for game in range(games)]
+    game_values = dict([(name, []) for name, typecode in GAME_COLUMNS])
+    move_values = dict([(name, []) for name, typecode in MOVE_COLUMNS])
+    # moves that tie on score are picked in set order, which depends on the hash seed,
+    # so every worker gets the same one to make the games replayable from their seeds
+    hash_seed = os.environ.get("PYTHONHASHSEED")
+    os.environ["PYTHONHASHSEED"] = "0"
+    try:
+        pool = multiprocessing.get_context("spawn").Pool(processes)
+    finally:
+        if hash_seed is None:
+            os.environ.pop("PYTHONHASHSEED")
+        else:
+            os.environ["PYTHONHASHSEED"] = hash_seed
+    try:
+        for game_row, move_rows in pool.imap(play_game, tasks):
+            for (name, typecode), value in zip(GAME_COLUMNS, game_row):
+                game_values[name].append(value)
+            for row in move_rows:
+                for (name, typecode), value in zip(MOVE_COLUMNS, row):
+                    move_values[name].append(value)
+    finally:
+        pool.terminate()
+        pool.join()
+    tables = {"games": (GAME_COLUMNS, game_values), "moves": (MOVE_COLUMNS, move_values)}
+    if file_name is not None:
+        write_results(file_name, tables)
+    return tables
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="plays bots against each other without the GUI")
+    parser.add_argument("bots", nargs="*", default=["BotV1", "BotV1"],
+                        help="2 to 4 bot classes from scrabble, or module.Class")
+    parser.add_argument("--games", type=int, default=10)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-moves", type=int, default=500)
+    parser.add_argument("--gaddag", action="store_true", help="bots use the GADDAG move generator")
+    parser.add_argument("--output", default="results.scr")
+    arguments = parser.parse_args()
+    if not 2 <= len(arguments.bots) <= 4:
+        parser.error("a game needs 2 to 4 bots")
+    t0 = time.time()
+    results = run_tournament(arguments.bots, arguments.games, arguments.processes, arguments.seed,
+                             scrabble.GADDAG if arguments.gaddag else None, arguments.max_moves, arguments.output)
+    games, moves = results["games"][1], results["moves"][1]
+    wins = [games["winner"].count(i) for i in range(len(arguments.bots))]
+    print("{0} games, {1} moves in {2:.1f}s, wins {3}, mean move latency {4:.3f}s".format(
+        len(games["game"]), len(moves["move"]), time.time() - t0, wins,
+        sum(moves["latency"]) / max(len(moves["latency"]), 1)))
+    print("results written to {0}".format(arguments.output))